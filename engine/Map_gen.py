@@ -1,8 +1,19 @@
+import weakref
+from array import array
 from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, Tuple
-from rich.console import Console
-console = Console(markup=True)
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+# rich is only needed by the terminal game; it is imported on first render
+# so the server never pays for it.
+_console = None
+
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console(markup=True)
+    return _console
 def get_int(prompt: str) -> int:
     while True:
         try:
@@ -17,6 +28,79 @@ class CellType(Enum):
     START = "S"
     END = "E"
     OBSTACLE = "X"
+# -----------------------------
+# Copy-on-write cells for snapshots
+# -----------------------------
+class CellOverlay(dict):
+    """
+    Cells of a map snapshot. Only cells written after the snapshot was taken
+    are stored here; every other lookup falls through to the base cells.
+
+    Plain `cells[pos]` reads stay dict lookups. Iteration and `get` are
+    overridden so the overlay still looks like a full cell dict.
+    """
+
+    __slots__ = ("base", "detach", "__weakref__")
+
+    def __init__(self, base: Dict[Tuple[int, int], "CellType"]):
+        super().__init__()
+        self.base = base
+        # Unregisters this overlay's link from the base map (set by snapshot).
+        self.detach = None
+
+    def __missing__(self, pos: Tuple[int, int]) -> "CellType":
+        return self.base[pos]
+
+    def __contains__(self, pos: object) -> bool:
+        return pos in self.base
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self.base)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def get(self, pos, default=None):
+        return self[pos] if pos in self.base else default
+
+    def keys(self):
+        return self.base.keys()
+
+    def values(self):
+        return (self[pos] for pos in self.base)
+
+    def items(self):
+        return ((pos, self[pos]) for pos in self.base)
+
+    def copy(self) -> Dict[Tuple[int, int], "CellType"]:
+        return dict(self.items())
+
+    def written(self) -> Dict[Tuple[int, int], "CellType"]:
+        """
+        Cells that differ from, or were pinned against changes to, the base.
+        """
+        return dict(dict.items(self))
+
+
+class _SnapshotLink:
+    """
+    Derived entry on a base map that keeps one snapshot isolated: before a
+    base cell changes, its old value is pinned into the snapshot's overlay
+    (unless the snapshot already wrote that cell). Holds the overlay weakly;
+    it is unregistered when the snapshot is released or garbage collected.
+    """
+
+    def __init__(self, overlay: CellOverlay):
+        self.overlay = weakref.ref(overlay)
+
+    def cell_changed(self, grid_map: "GridMap", pos: Tuple[int, int], old: "CellType", new: "CellType") -> None:
+        overlay = self.overlay()
+        if overlay is None:
+            return
+        if not dict.__contains__(overlay, pos):
+            dict.__setitem__(overlay, pos, old)
+
+
 # -----------------------------
 # Map data container
 # -----------------------------
@@ -27,12 +111,84 @@ class GridMap:
     cells: Dict[Tuple[int, int], CellType]
     start: Tuple[int, int]
     end: Tuple[int, int]
+    # Mission goals visited (in an optimized order) before `end`.
+    waypoints: List[Tuple[int, int]] = field(default_factory=list)
+    # Per-cell cost of entering a cell, row-major (y * width + x), 1..255.
+    # None means uniform terrain where every move costs 1.
+    costs: Optional[array] = field(default=None, repr=False)
+    # Structures computed from this map (distance fields, ...). Each one
+    # gets cell_changed(grid_map, pos, old, new) on every set_cell call.
+    derived: Dict[Any, Any] = field(default_factory=dict, repr=False, compare=False)
 
     def in_bounds(self, x: int, y: int) -> bool:
         return 0 <= x < self.width and 0 <= y < self.height
+
+    def cost(self, pos: Tuple[int, int]) -> int:
+        if self.costs is None:
+            return 1
+        return self.costs[pos[1] * self.width + pos[0]]
+
+    def max_cost(self) -> int:
+        return 1 if self.costs is None else max(self.costs)
+
+    def min_cost(self) -> int:
+        return 1 if self.costs is None else min(self.costs)
+
+    def set_cell(self, pos: Tuple[int, int], cell: "CellType") -> None:
+        old = self.cells[pos]
+        if old == cell:
+            return
+        self.cells[pos] = cell
+        for structure in list(self.derived.values()):
+            structure.cell_changed(self, pos, old, cell)
+
+    def snapshot(self) -> "GridMap":
+        """
+        O(1) copy-on-write view of this map for hypothetical edits.
+
+        Writes to the snapshot (through set_cell) stay in the snapshot, and
+        later set_cell calls on this map do not show through. Derived
+        structures are not shared; the snapshot builds its own on demand.
+        Call release() on the snapshot when done with it (dropping the last
+        reference does the same).
+        """
+        overlay = CellOverlay(self.cells)
+        link = _SnapshotLink(overlay)
+        key = ("snapshot", id(link))
+        self.derived[key] = link
+        overlay.detach = weakref.finalize(overlay, self.derived.pop, key, None)
+        return GridMap(
+            width=self.width,
+            height=self.height,
+            cells=overlay,
+            start=self.start,
+            end=self.end,
+            waypoints=list(self.waypoints),
+            costs=self.costs,
+        )
+
+    def release(self) -> None:
+        """
+        Detach this snapshot from its base map, so base edits stop paying
+        for it. The snapshot must not be read afterwards: later base edits
+        would show through. No-op on maps that are not snapshots.
+        """
+        if isinstance(self.cells, CellOverlay) and self.cells.detach is not None:
+            self.cells.detach()
     def __repr__(self):
         return f"GridMap({self.width}x{self.height}, start={self.start}, end={self.end}, obstacles={sum(1 for c in self.cells.values() if c.name=='OBSTACLE')})"
 
+def make_costs(width: int, height: int, terrain: Dict[Tuple[int, int], int]) -> Optional[array]:
+    """
+    Compact cost array for the given non-default cells (None if all cost 1).
+    """
+    if not terrain or all(cost == 1 for cost in terrain.values()):
+        return None
+    costs = array("B", [1]) * (width * height)
+    for (x, y), cost in terrain.items():
+        costs[y * width + x] = cost
+    return costs
+
 # -----------------------------
 # Map generator
 # -----------------------------
@@ -103,7 +259,7 @@ def render_map(grid_map: GridMap, robot=None) -> None:
             else:
                 row.append("[dim]O[/dim]")
 
-        console.print(" ".join(row))
+        get_console().print(" ".join(row))
 # -----------------------------
 # Example usage
 # -----------------------------
@@ -1,11 +1,16 @@
 # obstacles.py
-from typing import List, Tuple
-from Map_gen import GridMap, CellType
+from typing import Iterable, List, Optional, Set, Tuple
+from engine.Map_gen import GridMap, CellType
+from engine.reachability import route_exists
 Position = Tuple[int, int]
 class ObstacleManager:
-    def __init__(self, grid_map: GridMap):
+    def __init__(self, grid_map: GridMap, obstacles: Optional[Iterable[Position]] = None):
         self.grid_map = grid_map
-        self.obstacles: List[Position] = []
+        # Set-backed: membership, add and remove are O(1).
+        self.obstacles: Set[Position] = set(obstacles) if obstacles is not None else set()
+        # Bumped on every committed edit; open transactions use it to
+        # detect that the live obstacles changed underneath them.
+        self.version = 0
 
     # -----------------------------
     # Utility helpers
@@ -18,11 +23,28 @@ class ObstacleManager:
             (x, y - 1),
         ]
 
-    def is_free_cell(self, pos: Position) -> bool:
+    def is_free_cell(self, pos: Position, grid_map: Optional[GridMap] = None) -> bool:
+        grid_map = self.grid_map if grid_map is None else grid_map
         x, y = pos
-        if not self.grid_map.in_bounds(x, y):
+        if not grid_map.in_bounds(x, y):
             return False
-        return self.grid_map.cells[(x, y)] == CellType.EMPTY
+        if pos in grid_map.waypoints:
+            return False
+        return grid_map.cells[(x, y)] == CellType.EMPTY
+
+    # -----------------------------
+    # Snapshots & transactions
+    # -----------------------------
+    def snapshot(self) -> "ObstacleManager":
+        """
+        Independent manager over a copy-on-write snapshot of the map.
+        Moves made on it never touch the live map or obstacle set. Copies
+        the obstacle set; transactions (begin) stage deltas instead.
+        """
+        return ObstacleManager(self.grid_map.snapshot(), self.obstacles)
+
+    def begin(self) -> "ObstacleTransaction":
+        return ObstacleTransaction(self)
 
     # -----------------------------
     # Initial placement (WITH BFS)
@@ -30,28 +52,25 @@ class ObstacleManager:
     def place_initial_obstacles(
         self,
         positions: List[Position],
-        path_exists_fn,
+        path_exists_fn=route_exists,
     ) -> None:
         """
         Place initial obstacles one by one.
-        Each placement is validated using BFS to ensure
-        at least one path from start to end still exists.
+        Each placement is validated (bidirectional BFS by default)
+        to ensure at least one path from start to end (and to every
+        waypoint) still exists.
         """
 
         for pos in positions:
             if not self._can_place_initial(pos):
                 raise ValueError(f"Invalid obstacle position: {pos}")
 
-            # simulate placement
-            self._place_obstacle(pos)
-
-            # check path validity
-            if not path_exists_fn(self.grid_map):
-                # rollback
-                self._remove_obstacle(pos)
-                raise ValueError(
-                    f"Obstacle at {pos} blocks all paths"
-                )
+            with self.begin() as tx:
+                tx.place(pos)
+                if not tx.commit(path_exists_fn):
+                    raise ValueError(
+                        f"Obstacle at {pos} blocks all paths"
+                    )
 
     def _can_place_initial(self, pos: Position) -> bool:
         if pos == self.grid_map.start:
@@ -63,41 +82,141 @@ class ObstacleManager:
         return True
 
     def _place_obstacle(self, pos: Position) -> None:
-        self.grid_map.cells[pos] = CellType.OBSTACLE
-        self.obstacles.append(pos)
+        self.grid_map.set_cell(pos, CellType.OBSTACLE)
+        self.obstacles.add(pos)
+        self.version += 1
 
     # -----------------------------
     # Moving obstacles (user or robot)
     # -----------------------------
+    def can_move(self, from_pos: Position, to_pos: Position) -> bool:
+        """
+        Local rules only (ownership, adjacency, free target); path
+        validation happens once per transaction.
+        """
+        if from_pos not in self.obstacles:
+            return False
+
+        if to_pos not in self.neighbours(*from_pos):
+            return False
+
+        return self.is_free_cell(to_pos)
+
     def move_obstacle(
         self,
         from_pos: Position,
         to_pos: Position,
-        path_exists_fn,
+        path_exists_fn=route_exists,
     ) -> bool:
 
-        if from_pos not in self.obstacles:
-            return False
+        with self.begin() as tx:
+            if not tx.move(from_pos, to_pos):
+                return False
+            return tx.commit(path_exists_fn)
 
-        if to_pos not in self.neighbours(*from_pos):
+    def _remove_obstacle(self, pos: Position) -> None:
+        self.grid_map.set_cell(pos, CellType.EMPTY)
+        self.obstacles.discard(pos)
+        self.version += 1
+
+
+class ObstacleTransaction:
+    """
+    A batch of obstacle edits staged on a snapshot of the map, validated
+    once, then written to the live map (commit) or dropped (abort).
+
+    The live map is untouched until commit, so other readers never see a
+    half-applied batch. Staged obstacles are kept as added/removed deltas
+    over the live set, so opening a transaction costs O(1), not O(n). Used
+    as a context manager, a transaction that was not committed is aborted
+    on exit.
+    """
+
+    def __init__(self, manager: ObstacleManager):
+        self.manager = manager
+        # The staged map, with every edit so far applied.
+        self.grid_map = manager.grid_map.snapshot()
+        self.added: Set[Position] = set()
+        self.removed: Set[Position] = set()
+        self.open = True
+        self._version = manager.version
+
+    def has_obstacle(self, pos: Position) -> bool:
+        """
+        Whether pos holds a managed obstacle once the staged edits apply.
+        """
+        if pos in self.added:
+            return True
+        return pos not in self.removed and pos in self.manager.obstacles
+
+    def __enter__(self) -> "ObstacleTransaction":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.open:
+            self.abort()
+
+    def _check_open(self) -> None:
+        if not self.open:
+            raise RuntimeError("Transaction is already closed")
+
+    def place(self, pos: Position) -> None:
+        self._check_open()
+        self.grid_map.set_cell(pos, CellType.OBSTACLE)
+        if pos in self.removed:
+            self.removed.discard(pos)
+        else:
+            self.added.add(pos)
+
+    def remove(self, pos: Position) -> None:
+        self._check_open()
+        self.grid_map.set_cell(pos, CellType.EMPTY)
+        if pos in self.added:
+            self.added.discard(pos)
+        else:
+            self.removed.add(pos)
+
+    def move(self, from_pos: Position, to_pos: Position) -> bool:
+        """
+        Stage one move if it passes the local rules on the staged map.
+        """
+        self._check_open()
+        if not self.has_obstacle(from_pos):
             return False
-
-        if not self.is_free_cell(to_pos):
+        if to_pos not in self.manager.neighbours(*from_pos):
             return False
+        if not self.manager.is_free_cell(to_pos, self.grid_map):
+            return False
+        self.remove(from_pos)
+        self.place(to_pos)
+        return True
 
-        # simulate move
-        self._remove_obstacle(from_pos)
-        self._place_obstacle(to_pos)
+    def validate(self, path_exists_fn=route_exists) -> bool:
+        return path_exists_fn(self.grid_map)
 
-        # validate with BFS
-        if not path_exists_fn(self.grid_map):
-            # rollback
-            self._remove_obstacle(to_pos)
-            self._place_obstacle(from_pos)
+    def commit(self, path_exists_fn=route_exists) -> bool:
+        """
+        Validate the staged map once and apply the net edits to the live map.
+        Returns False (and aborts) if validation fails or the live obstacles
+        changed since begin().
+        """
+        self._check_open()
+        self.open = False
+        manager = self.manager
+        valid = manager.version == self._version and path_exists_fn(self.grid_map)
+        # Unpin before touching the live map, so the edits below don't
+        # copy cells into a snapshot nobody reads any more.
+        self.grid_map.release()
+        if not valid:
             return False
 
+        for pos in self.removed:
+            manager._remove_obstacle(pos)
+        for pos in self.added:
+            manager._place_obstacle(pos)
         return True
 
-    def _remove_obstacle(self, pos: Position) -> None:
-        self.grid_map.cells[pos] = CellType.EMPTY
-        self.obstacles.remove(pos)
+    def abort(self) -> None:
+        self._check_open()
+        self.open = False
+        self.grid_map.release()
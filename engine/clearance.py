@@ -0,0 +1,269 @@
+# clearance.py
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from typing import List, Set, Tuple
+
+from engine.Map_gen import CellType, GridMap
+
+Position = Tuple[int, int]
+
+# 3-4 chamfer weights: a straight step costs 3, a diagonal step 4, so
+# distances divided by CHAMFER_STRAIGHT approximate Euclidean cells.
+CHAMFER_STRAIGHT = 3
+CHAMFER_DIAGONAL = 4
+
+# Distance stored for every cell when the map has no obstacles.
+FAR = 1 << 30
+
+
+# -----------------------------
+# Distance transform
+# -----------------------------
+class ClearanceMap:
+    """
+    Chamfer distance from every cell to its nearest obstacle.
+
+    Built with the classic two-pass transform (forward, then backward
+    raster scan over a flat row-major array). Attached to a GridMap via
+    `derived`, so an obstacle edit repairs only the cells whose nearest
+    obstacle actually changes instead of redoing both passes.
+    """
+
+    def __init__(self, grid_map: GridMap):
+        self.width = grid_map.width
+        self.height = grid_map.height
+        self.dist = array("i", [FAR]) * (self.width * self.height)
+        self._build(grid_map)
+
+    def get(self, pos: Position) -> int:
+        """
+        Raw chamfer distance (0 on obstacles, FAR if there are none).
+        """
+        return self.dist[pos[1] * self.width + pos[0]]
+
+    def clearance(self, pos: Position) -> float:
+        """
+        Approximate Euclidean distance, in cells, to the nearest obstacle.
+        """
+        return self.get(pos) / CHAMFER_STRAIGHT
+
+    def _build(self, grid_map: GridMap) -> None:
+        width = self.width
+        height = self.height
+        dist = self.dist
+        cells = grid_map.cells
+        obstacle = CellType.OBSTACLE
+        s, d = CHAMFER_STRAIGHT, CHAMFER_DIAGONAL
+
+        for y in range(height):
+            for x in range(width):
+                if cells[(x, y)] == obstacle:
+                    dist[y * width + x] = 0
+
+        # Forward pass: left, upper-left, up, upper-right.
+        for y in range(height):
+            row = y * width
+            for x in range(width):
+                i = row + x
+                best = dist[i]
+                if best == 0:
+                    continue
+                if x > 0 and dist[i - 1] + s < best:
+                    best = dist[i - 1] + s
+                if y > 0:
+                    up = i - width
+                    if dist[up] + s < best:
+                        best = dist[up] + s
+                    if x > 0 and dist[up - 1] + d < best:
+                        best = dist[up - 1] + d
+                    if x + 1 < width and dist[up + 1] + d < best:
+                        best = dist[up + 1] + d
+                dist[i] = best
+
+        # Backward pass: right, lower-right, down, lower-left.
+        for y in range(height - 1, -1, -1):
+            row = y * width
+            for x in range(width - 1, -1, -1):
+                i = row + x
+                best = dist[i]
+                if best == 0:
+                    continue
+                if x + 1 < width and dist[i + 1] + s < best:
+                    best = dist[i + 1] + s
+                if y + 1 < height:
+                    down = i + width
+                    if dist[down] + s < best:
+                        best = dist[down] + s
+                    if x + 1 < width and dist[down + 1] + d < best:
+                        best = dist[down + 1] + d
+                    if x > 0 and dist[down - 1] + d < best:
+                        best = dist[down - 1] + d
+                dist[i] = best
+
+    def _neighbours(self, index: int) -> List[Tuple[int, int]]:
+        """
+        (neighbour index, chamfer step weight) for the 8 surrounding cells.
+        """
+        width = self.width
+        height = self.height
+        x = index % width
+        y = index // width
+        out = []
+        for dy in (-1, 0, 1):
+            ny = y + dy
+            if ny < 0 or ny >= height:
+                continue
+            for dx in (-1, 0, 1):
+                nx = x + dx
+                if (dx == 0 and dy == 0) or nx < 0 or nx >= width:
+                    continue
+                weight = CHAMFER_DIAGONAL if dx and dy else CHAMFER_STRAIGHT
+                out.append((ny * width + nx, weight))
+        return out
+
+    def cell_changed(self, grid_map: GridMap, pos: Position, old: CellType, new: CellType) -> None:
+        if new == CellType.OBSTACLE:
+            self.lower(pos)
+        elif old == CellType.OBSTACLE:
+            self.raise_(pos)
+
+    def lower(self, pos: Position) -> List[int]:
+        """
+        pos just became an obstacle: distances can only shrink, so a
+        wavefront from pos settles every cell that is now closer to it.
+        Returns the indices whose distance changed.
+        """
+        dist = self.dist
+        source = pos[1] * self.width + pos[0]
+        if dist[source] == 0:
+            return []
+
+        dist[source] = 0
+        changed = [source]
+        heap = [(0, source)]
+        while heap:
+            d, cur = heapq.heappop(heap)
+            if d != dist[cur]:
+                continue
+            for n, weight in self._neighbours(cur):
+                nd = d + weight
+                if nd < dist[n]:
+                    dist[n] = nd
+                    changed.append(n)
+                    heapq.heappush(heap, (nd, n))
+        return changed
+
+    def raise_(self, pos: Position) -> List[int]:
+        """
+        pos stopped being an obstacle: cells whose distance was only
+        supported through it are cleared and re-settled from the intact
+        border of that region. Returns the indices whose distance changed.
+        """
+        dist = self.dist
+        freed = pos[1] * self.width + pos[0]
+        if dist[freed] != 0:
+            return []
+
+        # 1. Cells that lose every supporting neighbour, smallest first so a
+        #    cell's possible supports are all decided before it is.
+        affected: Set[int] = {freed}
+        heap = [(dist[n], n) for n, w in self._neighbours(freed) if dist[n] == w]
+        heapq.heapify(heap)
+        checked: Set[int] = set()
+        while heap:
+            d, cur = heapq.heappop(heap)
+            if cur in checked:
+                continue
+            checked.add(cur)
+            supported = any(
+                n not in affected and dist[n] + w == d
+                for n, w in self._neighbours(cur)
+            )
+            if supported:
+                continue
+            affected.add(cur)
+            for n, w in self._neighbours(cur):
+                if dist[n] == d + w and n not in checked:
+                    heapq.heappush(heap, (dist[n], n))
+
+        for index in affected:
+            dist[index] = FAR
+
+        # 2. Re-seed the region from its border and settle it.
+        heap = []
+        for index in affected:
+            best = FAR
+            for n, w in self._neighbours(index):
+                if n not in affected and dist[n] + w < best:
+                    best = dist[n] + w
+            if best < FAR:
+                dist[index] = best
+                heap.append((best, index))
+        heapq.heapify(heap)
+        while heap:
+            d, cur = heapq.heappop(heap)
+            if d != dist[cur]:
+                continue
+            for n, w in self._neighbours(cur):
+                if n in affected and d + w < dist[n]:
+                    dist[n] = d + w
+                    heapq.heappush(heap, (d + w, n))
+
+        return list(affected)
+
+
+def clearance_map(grid_map: GridMap) -> ClearanceMap:
+    """
+    Cached clearance map for this grid, kept current through set_cell.
+    """
+    clearance = grid_map.derived.get("clearance")
+    if clearance is None:
+        clearance = ClearanceMap(grid_map)
+        grid_map.derived["clearance"] = clearance
+    return clearance
+
+
+# -----------------------------
+# Planner cost profiles
+# -----------------------------
+@dataclass
+class SafetyProfile:
+    """
+    Clearance rules a planner applies per cell, as raw chamfer lookups.
+
+    Cells with dist < min_dist are off limits; cells with dist < len(penalty)
+    cost penalty[dist] extra to enter.
+    """
+
+    dist: array
+    min_dist: int
+    penalty: List[int]
+
+    @property
+    def max_penalty(self) -> int:
+        return max(self.penalty, default=0)
+
+
+def safety_profile(
+    grid_map: GridMap,
+    min_clearance: float = 0.0,
+    weight: float = 0.0,
+    radius: float = 0.0,
+) -> SafetyProfile:
+    """
+    Profile that forbids cells closer than min_clearance cells to an
+    obstacle and charges weight * (radius - clearance) extra for cells
+    within radius cells of one.
+    """
+    reach = int(radius * CHAMFER_STRAIGHT)
+    penalty = [
+        int(round(weight * (radius - raw / CHAMFER_STRAIGHT)))
+        for raw in range(reach)
+    ]
+    return SafetyProfile(
+        dist=clearance_map(grid_map).dist,
+        min_dist=math.ceil(min_clearance * CHAMFER_STRAIGHT - 1e-9),
+        penalty=penalty,
+    )
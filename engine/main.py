@@ -1,10 +1,11 @@
 # main.py
+# Run from the repository root: python -m engine.main
 
-from Map_gen import generate_map, render_map, get_int
-from Obstacles import ObstacleManager
-from pathfinding import path_exists
-from user_side_game import UserSide
-from robot import Robot
+from engine.Map_gen import generate_map, render_map, get_int
+from engine.Obstacles import ObstacleManager
+from engine.pathfinding import path_exists
+from engine.user_side_game import UserSide
+from engine.robot import Robot
 
 
 def print_status(robot: Robot, user: UserSide):
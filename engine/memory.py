@@ -0,0 +1,231 @@
+# memory.py
+import ast
+import os
+import sys
+import threading
+import tracemalloc
+from dataclasses import dataclass
+from enum import Enum
+from types import BuiltinFunctionType, FunctionType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Objects shared by every session (enum members, classes, functions) are not
+# part of any one session's footprint.
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, Enum)
+
+
+# -----------------------------
+# Deep size estimates
+# -----------------------------
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate bytes reachable from obj (containers, instance dicts, slots).
+    Each object is counted once; shared singletons are skipped.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, _SHARED_TYPES) or cur is None:
+            continue
+        ident = id(cur)
+        if ident in seen:
+            continue
+        seen.add(ident)
+        total += sys.getsizeof(cur)
+
+        if isinstance(cur, dict):
+            stack.extend(cur.keys())
+            stack.extend(cur.values())
+        elif isinstance(cur, (list, tuple, set, frozenset)):
+            stack.extend(cur)
+        elif isinstance(cur, (str, bytes, bytearray, int, float, bool)):
+            continue
+        else:
+            inst_dict = getattr(cur, "__dict__", None)
+            if inst_dict is not None:
+                stack.append(inst_dict)
+            for slot in getattr(type(cur), "__slots__", ()):
+                if hasattr(cur, slot):
+                    stack.append(getattr(cur, slot))
+
+    return total
+
+
+def process_rss(pid: Optional[int] = None) -> Optional[int]:
+    """
+    Resident set size in bytes for pid (default: this process), or None.
+    """
+    pid = os.getpid() if pid is None else pid
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+# -----------------------------
+# Per-planner peak allocations
+# -----------------------------
+@dataclass
+class PlannerMemoryStats:
+    calls: int = 0
+    sampled: int = 0
+    peak_max: int = 0
+    peak_total: int = 0
+
+    @property
+    def peak_mean(self) -> float:
+        return self.peak_total / self.sampled if self.sampled else 0.0
+
+
+PLANNER_MEMORY: Dict[str, PlannerMemoryStats] = {}
+
+# Measure one in every N planner calls; 0 disables sampling.
+_sample_every = int(os.environ.get("PATHWATCH_PLANNER_MEM_SAMPLE", "0") or 0)
+_sample_lock = threading.Lock()
+
+
+def set_planner_sampling(every: int) -> None:
+    global _sample_every
+    _sample_every = max(0, every)
+
+
+def measure_planner(name: str, fn: Callable[..., T], *args: Any) -> T:
+    """
+    Call a planner, recording the peak memory it allocated on sampled calls.
+
+    Unsampled calls cost one counter bump. Sampled calls are serialized and
+    use tracemalloc's peak, which also sees other threads' allocations, so
+    peaks are upper bounds under concurrency.
+    """
+    stats = PLANNER_MEMORY.get(name)
+    if stats is None:
+        stats = PLANNER_MEMORY.setdefault(name, PlannerMemoryStats())
+    stats.calls += 1
+
+    every = _sample_every
+    if every <= 0 or stats.calls % every:
+        return fn(*args)
+
+    with _sample_lock:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(1)
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            return fn(*args)
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            used = max(0, peak - before)
+            stats.sampled += 1
+            stats.peak_total += used
+            stats.peak_max = max(stats.peak_max, used)
+
+
+# -----------------------------
+# Allocation hotspots by engine function
+# -----------------------------
+_function_spans: Dict[str, List[Tuple[int, int, str]]] = {}
+
+
+def _spans_for(filename: str) -> List[Tuple[int, int, str]]:
+    spans = _function_spans.get(filename)
+    if spans is not None:
+        return spans
+
+    spans = []
+    try:
+        with open(filename) as source:
+            tree = ast.parse(source.read())
+    except (OSError, SyntaxError):
+        tree = None
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                if not isinstance(child, ast.ClassDef):
+                    spans.append((child.lineno, child.end_lineno or child.lineno, name))
+                visit(child, f"{name}.")
+
+    if tree is not None:
+        visit(tree, "")
+    # Innermost (latest-starting) span first.
+    spans.sort(key=lambda span: -span[0])
+    _function_spans[filename] = spans
+    return spans
+
+
+def _function_at(filename: str, lineno: int) -> str:
+    for first, last, name in _spans_for(filename):
+        if first <= lineno <= last:
+            return name
+    return "<module>"
+
+
+def allocation_hotspots(
+    snapshot: tracemalloc.Snapshot,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Live allocations made from engine code, grouped by engine function.
+    """
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(True, os.path.join(ENGINE_DIR, "*")),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+    grouped: Dict[Tuple[str, str], List[int]] = {}
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        module = os.path.splitext(os.path.basename(frame.filename))[0]
+        key = (module, _function_at(frame.filename, frame.lineno))
+        entry = grouped.setdefault(key, [0, 0])
+        entry[0] += stat.size
+        entry[1] += stat.count
+
+    ranked = sorted(grouped.items(), key=lambda item: -item[1][0])
+    return [
+        {"module": module, "function": function, "bytes": size, "blocks": count}
+        for (module, function), (size, count) in ranked[:limit]
+    ]
+
+
+def start_tracing(frames: int = 1) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def take_snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot()
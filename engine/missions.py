@@ -0,0 +1,395 @@
+# missions.py
+import heapq
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from engine.Map_gen import CellType, GridMap
+
+Position = Tuple[int, int]
+
+INF = 1 << 30
+
+# Up to this many waypoints the visiting order is solved exactly (Held-Karp);
+# above it, nearest-neighbour + 2-opt.
+EXACT_LIMIT = 10
+
+
+# -----------------------------
+# Incremental distance fields
+# -----------------------------
+class DistanceField:
+    """
+    BFS distances from one source to every cell, kept exact under obstacle
+    edits by repairing only the cells whose distance actually changes.
+
+    The grid is 4-connected with unit costs, so distances are symmetric:
+    the field from a waypoint also answers "how far is any cell from it".
+    """
+
+    def __init__(self, grid_map: GridMap, source: Position):
+        self.width = grid_map.width
+        self.height = grid_map.height
+        self.source = source
+        self.dist: List[int] = [INF] * (self.width * self.height)
+        self._build(grid_map)
+
+    def get(self, pos: Position) -> int:
+        return self.dist[pos[1] * self.width + pos[0]]
+
+    def _neighbours(self, index: int) -> List[int]:
+        width = self.width
+        x = index % width
+        out = []
+        if x + 1 < width:
+            out.append(index + 1)
+        if x > 0:
+            out.append(index - 1)
+        if index + width < width * self.height:
+            out.append(index + width)
+        if index >= width:
+            out.append(index - width)
+        return out
+
+    def _free(self, grid_map: GridMap, index: int) -> bool:
+        width = self.width
+        return grid_map.cells[(index % width, index // width)] != CellType.OBSTACLE
+
+    def _build(self, grid_map: GridMap) -> None:
+        dist = self.dist
+        src = self.source[1] * self.width + self.source[0]
+        if not self._free(grid_map, src):
+            return
+        dist[src] = 0
+        queue = deque([src])
+        while queue:
+            cur = queue.popleft()
+            nd = dist[cur] + 1
+            for nxt in self._neighbours(cur):
+                if dist[nxt] == INF and self._free(grid_map, nxt):
+                    dist[nxt] = nd
+                    queue.append(nxt)
+
+    def block(self, grid_map: GridMap, pos: Position) -> List[int]:
+        """
+        pos just became an obstacle. Returns indices whose distance changed.
+        """
+        dist = self.dist
+        blocked = pos[1] * self.width + pos[0]
+        if dist[blocked] == INF:
+            return []
+
+        # 1. Cells that lose every shortest-path parent, found level by level.
+        #    FIFO order guarantees all parents of a cell are decided first.
+        affected = {blocked}
+        checked = set()
+        queue = deque(n for n in self._neighbours(blocked) if dist[n] == dist[blocked] + 1)
+        while queue:
+            cur = queue.popleft()
+            if cur in checked:
+                continue
+            checked.add(cur)
+            want = dist[cur] - 1
+            supported = any(
+                dist[n] == want and n not in affected
+                for n in self._neighbours(cur)
+            )
+            if supported:
+                continue
+            affected.add(cur)
+            queue.extend(n for n in self._neighbours(cur) if dist[n] == dist[cur] + 1)
+
+        for index in affected:
+            dist[index] = INF
+
+        # 2. Re-seed the affected region from its intact border and settle it.
+        heap: List[Tuple[int, int]] = []
+        for index in affected:
+            if index == blocked:
+                continue
+            best = INF
+            for n in self._neighbours(index):
+                if dist[n] + 1 < best:
+                    best = dist[n] + 1
+            if best < INF:
+                dist[index] = best
+                heap.append((best, index))
+        heapq.heapify(heap)
+        while heap:
+            d, cur = heapq.heappop(heap)
+            if d != dist[cur]:
+                continue
+            for n in self._neighbours(cur):
+                if n in affected and n != blocked and d + 1 < dist[n]:
+                    dist[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
+
+        return list(affected)
+
+    def unblock(self, grid_map: GridMap, pos: Position) -> List[int]:
+        """
+        pos just stopped being an obstacle. Returns indices whose distance changed.
+        """
+        dist = self.dist
+        freed = pos[1] * self.width + pos[0]
+        best = INF
+        for n in self._neighbours(freed):
+            if dist[n] + 1 < best:
+                best = dist[n] + 1
+        if best >= INF:
+            return []
+
+        dist[freed] = best
+        changed = [freed]
+        queue = deque([freed])
+        while queue:
+            cur = queue.popleft()
+            nd = dist[cur] + 1
+            for n in self._neighbours(cur):
+                if nd < dist[n] and self._free(grid_map, n):
+                    dist[n] = nd
+                    changed.append(n)
+                    queue.append(n)
+        return changed
+
+
+class DistanceMatrix:
+    """
+    All-pairs distances between a fixed set of points, from one reverse
+    search per point (K searches instead of K^2). Attached to a GridMap via
+    `derived`, so obstacle edits repair the fields in place and bump
+    `version` only when a distance between two points actually changed.
+    """
+
+    def __init__(self, grid_map: GridMap, points: Sequence[Position]):
+        self.points: List[Position] = list(points)
+        self.fields = [DistanceField(grid_map, point) for point in self.points]
+        self.version = 0
+
+    def distance(self, i: int, j: int) -> int:
+        return self.fields[i].get(self.points[j])
+
+    def distances_from(self, pos: Position) -> List[int]:
+        return [field.get(pos) for field in self.fields]
+
+    def cell_changed(self, grid_map: GridMap, pos: Position, old: CellType, new: CellType) -> None:
+        if new == CellType.OBSTACLE:
+            repair = DistanceField.block
+        elif old == CellType.OBSTACLE:
+            repair = DistanceField.unblock
+        else:
+            return
+
+        width = grid_map.width
+        point_indices = {p[1] * width + p[0] for p in self.points}
+        for field in self.fields:
+            changed = repair(field, grid_map, pos)
+            if not point_indices.isdisjoint(changed):
+                self.version += 1
+
+
+def distance_matrix(grid_map: GridMap, points: Sequence[Position]) -> DistanceMatrix:
+    """
+    Cached matrix for these points on this map.
+    """
+    key = ("distance_matrix", tuple(points))
+    matrix = grid_map.derived.get(key)
+    if matrix is None:
+        matrix = DistanceMatrix(grid_map, points)
+        grid_map.derived[key] = matrix
+    return matrix
+
+
+# -----------------------------
+# Visiting order
+# -----------------------------
+def held_karp_order(
+    start_cost: Sequence[int],
+    cost: Sequence[Sequence[int]],
+    end_cost: Optional[Sequence[int]] = None,
+) -> List[int]:
+    """
+    Exact cheapest order to visit nodes 0..K-1 from a fixed start, optionally
+    finishing at a fixed end. start_cost[i] / end_cost[i] are the legs to and
+    from the fixed endpoints.
+    """
+    k = len(start_cost)
+    if k == 0:
+        return []
+
+    full = (1 << k) - 1
+    best: Dict[Tuple[int, int], int] = {}
+    parent: Dict[Tuple[int, int], int] = {}
+    for i in range(k):
+        best[(1 << i, i)] = start_cost[i]
+
+    for mask in range(1, full + 1):
+        for last in range(k):
+            here = best.get((mask, last))
+            if here is None:
+                continue
+            row = cost[last]
+            for nxt in range(k):
+                bit = 1 << nxt
+                if mask & bit:
+                    continue
+                key = (mask | bit, nxt)
+                value = here + row[nxt]
+                # Sums of unreachable (INF) legs grow without bound, so any
+                # fixed sentinel would eventually win; missing means unset.
+                known = best.get(key)
+                if known is None or value < known:
+                    best[key] = value
+                    parent[key] = last
+
+    def total(last: int) -> int:
+        extra = end_cost[last] if end_cost is not None else 0
+        return best[(full, last)] + extra
+
+    last = min(range(k), key=total)
+    order = [last]
+    mask = full
+    while (mask, last) in parent:
+        prev = parent[(mask, last)]
+        mask ^= 1 << last
+        last = prev
+        order.append(last)
+    order.reverse()
+    return order
+
+
+def two_opt_order(
+    start_cost: Sequence[int],
+    cost: Sequence[Sequence[int]],
+    end_cost: Optional[Sequence[int]] = None,
+) -> List[int]:
+    """
+    Nearest-neighbour tour improved with 2-opt until no reversal helps.
+    """
+    k = len(start_cost)
+    unvisited = set(range(k))
+    order: List[int] = []
+    current_row: Sequence[int] = start_cost
+    while unvisited:
+        nxt = min(unvisited, key=lambda i: current_row[i])
+        unvisited.remove(nxt)
+        order.append(nxt)
+        current_row = cost[nxt]
+
+    def leg(a: Optional[int], b: Optional[int]) -> int:
+        # None stands for the fixed start (as a) or the open/fixed end (as b).
+        if a is None:
+            return start_cost[b]
+        if b is None:
+            return end_cost[a] if end_cost is not None else 0
+        return cost[a][b]
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(k - 1):
+            before = order[i - 1] if i > 0 else None
+            for j in range(i + 1, k):
+                after = order[j + 1] if j + 1 < k else None
+                old = leg(before, order[i]) + leg(order[j], after)
+                new = leg(before, order[j]) + leg(order[i], after)
+                if new < old:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+    return order
+
+
+def solve_order(
+    start_cost: Sequence[int],
+    cost: Sequence[Sequence[int]],
+    end_cost: Optional[Sequence[int]] = None,
+) -> List[int]:
+    if len(start_cost) <= EXACT_LIMIT:
+        return held_karp_order(start_cost, cost, end_cost)
+    return two_opt_order(start_cost, cost, end_cost)
+
+
+# -----------------------------
+# Missions
+# -----------------------------
+class Mission:
+    """
+    Waypoints a robot must visit before heading to its final goal.
+
+    The order is re-solved only when the distance matrix reports a change
+    between points, or when the robot stops closing in on its current target
+    (stepping along a shortest path keeps the previous order optimal).
+    """
+
+    def __init__(self, waypoints: Sequence[Position]):
+        self.waypoints: List[Position] = list(dict.fromkeys(waypoints))
+        self.remaining: List[Position] = list(self.waypoints)
+        self.order: List[Position] = []
+        # (id, version) of the matrix the current order was solved against.
+        self._planned_on: Optional[Tuple[int, int]] = None
+        self._expected_distance: Optional[int] = None
+
+    @property
+    def complete(self) -> bool:
+        return not self.remaining
+
+    def visit(self, pos: Position) -> None:
+        if pos in self.remaining:
+            self.remaining.remove(pos)
+            if pos in self.order:
+                self.order.remove(pos)
+            self._expected_distance = None
+
+    def _resolve(
+        self,
+        grid_map: GridMap,
+        position: Position,
+        end: Position,
+    ) -> Tuple[List[Position], Tuple[int, int], int]:
+        """
+        (order, matrix stamp, distance to the first target) from position.
+        Reuses the cached order while it is still valid; never modifies the
+        mission.
+        """
+        points = self.waypoints + [end]
+        matrix = distance_matrix(grid_map, points)
+        index_of = {p: i for i, p in enumerate(points)}
+        here = matrix.distances_from(position)
+        stamp = (id(matrix), matrix.version)
+
+        stale = (
+            not self.order
+            or stamp != self._planned_on
+            or self._expected_distance is None
+            or here[index_of[self.order[0]]] != self._expected_distance
+        )
+        order = self.order
+        if stale:
+            nodes = [index_of[p] for p in self.remaining]
+            end_index = len(points) - 1
+            start_cost = [here[n] for n in nodes]
+            cost = [[matrix.distance(a, b) for b in nodes] for a in nodes]
+            end_cost = [matrix.distance(n, end_index) for n in nodes]
+            order = [self.remaining[i] for i in solve_order(start_cost, cost, end_cost)]
+        return order, stamp, here[index_of[order[0]]]
+
+    def peek_target(self, grid_map: GridMap, position: Position, end: Position) -> Position:
+        """
+        Next target from position without updating the cached order, so it
+        is safe to call on hypothetical maps (speculation).
+        """
+        if not self.remaining:
+            return end
+        order, _, _ = self._resolve(grid_map, position, end)
+        return order[0]
+
+    def next_target(self, grid_map: GridMap, position: Position, end: Position) -> Position:
+        """
+        Next target for the robot's real move; caches the order it used.
+        """
+        if not self.remaining:
+            return end
+
+        self.order, self._planned_on, distance = self._resolve(grid_map, position, end)
+        # After one step along a shortest path the target should be one closer.
+        self._expected_distance = distance - 1
+        return self.order[0]
@@ -0,0 +1,417 @@
+# parallel.py
+import atexit
+import multiprocessing
+import os
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from engine.Map_gen import CellType, GridMap
+from engine.pathfinding import bfs_shortest_path
+
+Position = Tuple[int, int]
+T = TypeVar("T")
+
+# Below this many cells the per-level IPC costs more than it saves.
+MIN_PARALLEL_CELLS = 512 * 512
+
+# Map sizes the module-level helpers keep a worker pool for; each pool
+# holds one process per strip, so the least recently used one is closed.
+POOLS = 2
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def _strip_worker(conn, mask_name: str, dist_name: str, width: int, height: int, y0: int, y1: int) -> None:
+    """
+    Owns rows [y0, y1). Keeps its own frontier between levels and only
+    ships cells that step into a neighbouring strip back to the parent.
+    """
+    mask_shm = shared_memory.SharedMemory(name=mask_name)
+    dist_shm = shared_memory.SharedMemory(name=dist_name)
+    mask = mask_shm.buf
+    dist = dist_shm.buf.cast("i")
+    lo = y0 * width
+    hi = y1 * width
+    frontier: List[int] = []
+
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                return
+
+            if message[0] == "reset":
+                frontier = []
+                dist_shm.buf[lo * 4:hi * 4] = b"\xff" * ((hi - lo) * 4)
+                conn.send(None)
+                continue
+
+            _, level, incoming = message
+            for i in incoming:
+                if dist[i] < 0 and not mask[i]:
+                    dist[i] = level
+                    frontier.append(i)
+
+            next_level = level + 1
+            local: List[int] = []
+            up: List[int] = []
+            down: List[int] = []
+            for i in frontier:
+                x = i % width
+                if x + 1 < width:
+                    n = i + 1
+                    if dist[n] < 0 and not mask[n]:
+                        dist[n] = next_level
+                        local.append(n)
+                if x > 0:
+                    n = i - 1
+                    if dist[n] < 0 and not mask[n]:
+                        dist[n] = next_level
+                        local.append(n)
+                n = i - width
+                if n >= lo:
+                    if dist[n] < 0 and not mask[n]:
+                        dist[n] = next_level
+                        local.append(n)
+                elif n >= 0:
+                    up.append(n)
+                n = i + width
+                if n < hi:
+                    if dist[n] < 0 and not mask[n]:
+                        dist[n] = next_level
+                        local.append(n)
+                elif y1 < height:
+                    down.append(n)
+
+            frontier = local
+            conn.send((len(local), up, down))
+    finally:
+        del mask, dist
+        mask_shm.close()
+        dist_shm.close()
+
+
+# -----------------------------
+# Parent side
+# -----------------------------
+class _MaskLink:
+    """
+    Derived entry on the map a ParallelBFS's shared mask mirrors: obstacle
+    edits flip one mask byte instead of the next query recopying the map.
+    """
+
+    def __init__(self, search: "ParallelBFS"):
+        self.search = weakref.ref(search)
+
+    def cell_changed(self, grid_map: GridMap, pos: Position, old: CellType, new: CellType) -> None:
+        search = self.search()
+        if search is None or search.closed:
+            return
+        if new == CellType.OBSTACLE or old == CellType.OBSTACLE:
+            x, y = pos
+            search._mask_shm.buf[y * search.width + x] = int(new == CellType.OBSTACLE)
+
+
+class ParallelBFS:
+    """
+    Level-synchronous BFS split across worker processes by row strips.
+
+    The obstacle mask and the distance field live in shared memory, so
+    workers read and write cells directly. Each level, every busy worker
+    expands its own frontier inside its strip; only cells that cross into
+    a neighbouring strip travel through the parent. Distances are exactly
+    BFS levels, identical to bfs_shortest_path.
+
+    Workers and shared buffers are created once per map size and reused
+    for every query; close() (or a with-block) tears them down. The mask
+    stays attached to the last map it was loaded from (through `derived`),
+    so repeated queries on that map do not copy it again.
+    """
+
+    def __init__(self, width: int, height: int, workers: Optional[int] = None, mp_context=None):
+        self.width = width
+        self.height = height
+        count = workers or os.cpu_count() or 1
+        count = max(1, min(count, height))
+        self.workers = count
+
+        # Serialises queries when the search is shared between threads.
+        self.lock = threading.Lock()
+        self._mask_key = ("parallel_mask", id(self))
+        self._mask_map: Optional["weakref.ref[GridMap]"] = None
+
+        cells = width * height
+        self._mask_shm = shared_memory.SharedMemory(create=True, size=cells)
+        self._dist_shm = shared_memory.SharedMemory(create=True, size=cells * 4)
+        self.bounds = [y * height // count for y in range(count + 1)]
+
+        ctx = mp_context or multiprocessing.get_context()
+        self._conns = []
+        self._procs = []
+        try:
+            for w in range(count):
+                parent_end, child_end = ctx.Pipe()
+                proc = ctx.Process(
+                    target=_strip_worker,
+                    args=(
+                        child_end,
+                        self._mask_shm.name,
+                        self._dist_shm.name,
+                        width,
+                        height,
+                        self.bounds[w],
+                        self.bounds[w + 1],
+                    ),
+                    daemon=True,
+                )
+                proc.start()
+                child_end.close()
+                self._conns.append(parent_end)
+                self._procs.append(proc)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def closed(self) -> bool:
+        return self._mask_shm is None
+
+    def _owner(self, index: int) -> int:
+        y = index // self.width
+        bounds = self.bounds
+        w = y * self.workers // self.height
+        # bounds use floor division, so the estimate can be one strip off.
+        while y < bounds[w]:
+            w -= 1
+        while y >= bounds[w + 1]:
+            w += 1
+        return w
+
+    def load_mask(self, grid_map: GridMap) -> None:
+        """
+        Make the shared mask mirror grid_map's obstacles. Copies the map
+        only when the mask is not already attached to it.
+        """
+        attached = self._mask_map() if self._mask_map is not None else None
+        if attached is grid_map and self._mask_key in grid_map.derived:
+            return
+        self._detach_mask()
+
+        width = self.width
+        mask = bytearray(width * self.height)
+        obstacle = CellType.OBSTACLE
+        for (x, y), cell in grid_map.cells.items():
+            if cell == obstacle:
+                mask[y * width + x] = 1
+        self._mask_shm.buf[:len(mask)] = mask
+        grid_map.derived[self._mask_key] = _MaskLink(self)
+        self._mask_map = weakref.ref(grid_map)
+
+    def _detach_mask(self) -> None:
+        attached = self._mask_map() if self._mask_map is not None else None
+        if attached is not None:
+            attached.derived.pop(self._mask_key, None)
+        self._mask_map = None
+
+    def run(self, source: Position, goal: Optional[Position] = None) -> int:
+        """
+        BFS levels from source into the shared distance field (-1 where
+        unreachable). Stops early once goal is labelled; returns the number
+        of levels expanded.
+        """
+        conns = self._conns
+        for conn in conns:
+            conn.send(("reset",))
+        for conn in conns:
+            conn.recv()
+
+        width = self.width
+        dist = self._dist_shm.buf.cast("i")
+        try:
+            src = source[1] * width + source[0]
+            goal_idx = None if goal is None else goal[1] * width + goal[0]
+            incoming: List[List[int]] = [[] for _ in conns]
+            incoming[self._owner(src)].append(src)
+            busy = [False] * len(conns)
+
+            level = 0
+            while True:
+                sent = []
+                for w, conn in enumerate(conns):
+                    if busy[w] or incoming[w]:
+                        conn.send(("level", level, incoming[w]))
+                        sent.append(w)
+
+                incoming = [[] for _ in conns]
+                active = False
+                for w in sent:
+                    count, up, down = conns[w].recv()
+                    busy[w] = count > 0
+                    if up:
+                        incoming[w - 1].extend(up)
+                    if down:
+                        incoming[w + 1].extend(down)
+                    active = active or busy[w] or bool(up) or bool(down)
+
+                if goal_idx is not None and dist[goal_idx] >= 0:
+                    return level
+                if not active:
+                    return level
+                level += 1
+        finally:
+            dist.release()
+
+    def distance_field(self) -> array:
+        field = array("i")
+        field.frombytes(bytes(self._dist_shm.buf[:self.width * self.height * 4]))
+        return field
+
+    def distances(self, grid_map: GridMap, source: Position) -> array:
+        """
+        Full BFS distance field from source (row-major, -1 = unreachable).
+        """
+        self.load_mask(grid_map)
+        self.run(source)
+        return self.distance_field()
+
+    def shortest_path(
+        self,
+        grid_map: GridMap,
+        start: Position,
+        goal: Position,
+    ) -> Optional[List[Position]]:
+        """
+        A shortest start -> goal path, walked back down the distance field.
+        Same length as bfs_shortest_path; ties may be broken differently.
+        """
+        if grid_map.cells[start] == CellType.OBSTACLE or grid_map.cells[goal] == CellType.OBSTACLE:
+            return None
+        self.load_mask(grid_map)
+        self.run(start, goal)
+
+        width = self.width
+        height = self.height
+        dist = self._dist_shm.buf.cast("i")
+        try:
+            gx, gy = goal
+            if dist[gy * width + gx] < 0:
+                return None
+
+            path = [goal]
+            x, y = goal
+            d = dist[gy * width + gx]
+            while d > 0:
+                for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if 0 <= nx < width and 0 <= ny < height and dist[ny * width + nx] == d - 1:
+                        x, y = nx, ny
+                        break
+                path.append((x, y))
+                d -= 1
+            path.reverse()
+            return path
+        finally:
+            dist.release()
+
+    def close(self) -> None:
+        self._detach_mask()
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._procs = []
+        for shm in (self._mask_shm, self._dist_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._mask_shm = None
+        self._dist_shm = None
+
+    def __enter__(self) -> "ParallelBFS":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_pools: "OrderedDict[Tuple[int, int, Optional[int]], ParallelBFS]" = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def get_search(width: int, height: int, workers: Optional[int] = None) -> ParallelBFS:
+    """
+    Process-wide LRU of ParallelBFS pools keyed by map size, so the
+    one-off helpers below do not start workers on every call. Hold the
+    returned search's lock while querying it.
+    """
+    key = (width, height, workers)
+    evicted = None
+    with _pools_lock:
+        search = _pools.get(key)
+        if search is not None:
+            _pools.move_to_end(key)
+            return search
+        search = ParallelBFS(width, height, workers)
+        _pools[key] = search
+        if len(_pools) > POOLS:
+            _, evicted = _pools.popitem(last=False)
+    if evicted is not None:
+        with evicted.lock:
+            evicted.close()
+    return search
+
+
+@atexit.register
+def close_pools() -> None:
+    with _pools_lock:
+        searches = list(_pools.values())
+        _pools.clear()
+    for search in searches:
+        with search.lock:
+            search.close()
+
+
+def _query(grid_map: GridMap, workers: Optional[int], run: Callable[[ParallelBFS], T]) -> T:
+    while True:
+        search = get_search(grid_map.width, grid_map.height, workers)
+        with search.lock:
+            # Another thread may have evicted it between the two calls.
+            if not search.closed:
+                return run(search)
+
+
+def parallel_bfs_distances(
+    grid_map: GridMap,
+    source: Position,
+    workers: Optional[int] = None,
+) -> array:
+    """
+    Parallel BFS distance field, on the shared pool for this map size.
+    """
+    return _query(grid_map, workers, lambda search: search.distances(grid_map, source))
+
+
+def parallel_shortest_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    workers: Optional[int] = None,
+) -> Optional[List[Position]]:
+    """
+    Parallel BFS path for large maps; small maps use the serial BFS.
+    """
+    if grid_map.width * grid_map.height < MIN_PARALLEL_CELLS:
+        return bfs_shortest_path(grid_map, start, goal)
+    return _query(grid_map, workers, lambda search: search.shortest_path(grid_map, start, goal))
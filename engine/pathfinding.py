@@ -1,8 +1,16 @@
 # pathfinding.py
+import heapq
+import math
+import random
+import time
 from collections import deque
-from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from engine.Map_gen import CellType, GridMap
+from engine.clearance import CHAMFER_STRAIGHT, SafetyProfile, clearance_map, safety_profile
+from engine.memory import measure_planner
+from engine.reachability import route_exists
 
 Position = Tuple[int, int]
 PlannerFn = Callable[[GridMap, Position, Position], Optional[List[Position]]]
@@ -57,8 +65,229 @@ def bfs_shortest_path(
     return path
 
 
+def _bucket_search(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    use_heuristic: bool,
+    safety: Optional[SafetyProfile] = None,
+) -> Optional[List[Position]]:
+    """
+    Dial's bucket-queue search over integer terrain costs.
+
+    Nodes are filed into a circular array of buckets indexed by f = g + h.
+    With edge costs in [min_cost, max_cost] and the Manhattan heuristic
+    scaled by min_cost (consistent), every f pushed while expanding a node at
+    f = k lies in [k, k + max_cost + min_cost], so that many buckets suffice
+    and no heap is needed. Without the heuristic this is plain Dijkstra.
+
+    A safety profile adds clearance rules on top of the terrain: cells too
+    close to an obstacle are skipped (the goal excepted) and near cells pay
+    an extra entry cost. Penalties are >= 0, so the heuristic stays valid.
+    """
+    width = grid_map.width
+    height = grid_map.height
+    cells = grid_map.cells
+    costs = grid_map.costs
+    obstacle = CellType.OBSTACLE
+
+    h_scale = grid_map.min_cost() if use_heuristic else 0
+    max_step = grid_map.max_cost()
+    if safety is not None:
+        clear = safety.dist
+        min_dist = safety.min_dist
+        penalty = safety.penalty
+        reach = len(penalty)
+        max_step += safety.max_penalty
+    span = max_step + h_scale + 1
+    gx, gy = goal
+
+    start_idx = start[1] * width + start[0]
+    goal_idx = gy * width + gx
+    g: Dict[int, int] = {start_idx: 0}
+    parent: Dict[int, int] = {start_idx: -1}
+    closed = set()
+
+    buckets: List[List[int]] = [[] for _ in range(span)]
+    cursor = h_scale * (abs(start[0] - gx) + abs(start[1] - gy))
+    buckets[cursor % span].append(start_idx)
+    pending = 1
+
+    while pending:
+        bucket = buckets[cursor % span]
+        if not bucket:
+            cursor += 1
+            continue
+
+        cur = bucket.pop()
+        pending -= 1
+        if cur in closed:
+            continue
+        x = cur % width
+        y = cur // width
+        g_cur = g[cur]
+        if g_cur + h_scale * (abs(x - gx) + abs(y - gy)) != cursor:
+            continue  # stale entry, re-filed with a better g
+        closed.add(cur)
+        if cur == goal_idx:
+            break
+
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                continue
+            nxt = ny * width + nx
+            if nxt in closed or cells[(nx, ny)] == obstacle:
+                continue
+            g_next = g_cur + (1 if costs is None else costs[nxt])
+            if safety is not None:
+                room = clear[nxt]
+                if room < min_dist and nxt != goal_idx:
+                    continue
+                if room < reach:
+                    g_next += penalty[room]
+            if g_next < g.get(nxt, g_next + 1):
+                g[nxt] = g_next
+                parent[nxt] = cur
+                f = g_next + h_scale * (abs(nx - gx) + abs(ny - gy))
+                buckets[f % span].append(nxt)
+                pending += 1
+
+    if goal_idx not in closed:
+        return None
+
+    path: List[Position] = []
+    cur = goal_idx
+    while cur != -1:
+        path.append((cur % width, cur // width))
+        cur = parent[cur]
+
+    path.reverse()
+    return path
+
+
+def dijkstra_shortest_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+) -> Optional[List[Position]]:
+    """
+    Cheapest path under per-cell terrain costs (bucket-queue Dijkstra).
+    """
+    return _bucket_search(grid_map, start, goal, use_heuristic=False)
+
+
+def astar_shortest_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+) -> Optional[List[Position]]:
+    """
+    Cheapest path under per-cell terrain costs (bucket-queue A*).
+    """
+    return _bucket_search(grid_map, start, goal, use_heuristic=True)
+
+
+# Defaults for the "safe_astar" planner: no hard clearance limit, but each
+# cell within SAFETY_RADIUS cells of an obstacle costs extra to enter.
+MIN_CLEARANCE = 0.0
+SAFETY_WEIGHT = 2.0
+SAFETY_RADIUS = 3.0
+
+
+def safe_astar_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    min_clearance: float = MIN_CLEARANCE,
+    safety_weight: float = SAFETY_WEIGHT,
+    safety_radius: float = SAFETY_RADIUS,
+) -> Optional[List[Position]]:
+    """
+    Bucket A* over terrain plus clearance costs from the map's distance
+    transform. Never enters a cell closer than min_clearance cells to an
+    obstacle, except the goal.
+    """
+    profile = safety_profile(grid_map, min_clearance, safety_weight, safety_radius)
+    return _bucket_search(grid_map, start, goal, use_heuristic=True, safety=profile)
+
+
+# Obstacle repulsion for potential-field planning, as a function of the
+# distance to the nearest obstacle only (one clearance lookup per cell).
+REPULSION_GAIN = 5.0
+REPULSION_RADIUS = 3.0
+REVISIT_PENALTY = 2.0
+
+
+def potential_field_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+) -> Optional[List[Position]]:
+    """
+    Greedy descent on Manhattan attraction to the goal plus obstacle
+    repulsion. Falls back to an unvisited neighbour at local minima and
+    gives up when it is boxed in. Neither optimal nor complete.
+    """
+    clear = clearance_map(grid_map)
+    dist = clear.dist
+    width = grid_map.width
+    height = grid_map.height
+    cells = grid_map.cells
+    obstacle = CellType.OBSTACLE
+    gx, gy = goal
+
+    # Repulsion by raw chamfer distance; zero beyond the radius.
+    reach = int(REPULSION_RADIUS * CHAMFER_STRAIGHT) + 1
+    repulsion = [0.0] + [
+        REPULSION_GAIN / (raw / CHAMFER_STRAIGHT) ** 2 for raw in range(1, reach)
+    ]
+
+    def potential(x: int, y: int) -> float:
+        room = dist[y * width + x]
+        return abs(x - gx) + abs(y - gy) + (repulsion[room] if room < reach else 0.0)
+
+    if cells[start] == obstacle or cells[goal] == obstacle:
+        return None
+
+    path = [start]
+    seen = {start}
+    x, y = start
+    for _ in range(width * height * 6):
+        if (x, y) == goal:
+            return path
+
+        neighbours = [
+            (nx, ny)
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+            if 0 <= nx < width and 0 <= ny < height and cells[(nx, ny)] != obstacle
+        ]
+        if not neighbours:
+            return None
+
+        scored = [
+            (potential(nx, ny) + (REVISIT_PENALTY if (nx, ny) in seen else 0.0), (nx, ny))
+            for nx, ny in neighbours
+        ]
+        best_score, best = min(scored)
+        if best_score >= potential(x, y):
+            unvisited = [pos for pos in neighbours if pos not in seen]
+            if not unvisited:
+                return None
+            best = min(unvisited, key=lambda pos: potential(*pos))
+
+        path.append(best)
+        seen.add(best)
+        x, y = best
+
+    return path if (x, y) == goal else None
+
+
 PLANNERS: Dict[str, PlannerFn] = {
     "bfs": bfs_shortest_path,
+    "dijkstra": dijkstra_shortest_path,
+    "astar": astar_shortest_path,
+    "safe_astar": safe_astar_path,
+    "potential": potential_field_path,
 }
 
 
@@ -77,17 +306,22 @@ def shortest_path(
 ) -> Optional[List[Position]]:
     """
     Dispatcher for path planning algorithms defined in this module.
+    Calls go through measure_planner so peak memory can be sampled.
     """
     planner = PLANNERS.get(algorithm)
     if planner is None:
         raise ValueError(f"Unknown planner: {algorithm}")
-    return planner(grid_map, start, goal)
+    return measure_planner(algorithm, planner, grid_map, start, goal)
 
 
 def path_exists(grid_map: GridMap, algorithm: str = "bfs") -> bool:
     """
     Convenience checker used by obstacle validation logic.
+    The default goes through the reachability engine, which answers
+    yes/no without building a path and also covers mission waypoints.
     """
+    if algorithm == "bfs":
+        return route_exists(grid_map)
     return shortest_path(
         grid_map=grid_map,
         start=grid_map.start,
@@ -95,3 +329,746 @@ def path_exists(grid_map: GridMap, algorithm: str = "bfs") -> bool:
         algorithm=algorithm,
     ) is not None
 
+
+# -----------------------------
+# Anytime planning (ARA*)
+# -----------------------------
+# Weighted A* with a falling weight. Each round reuses the previous round's
+# g-values and search tree: nodes improved after they were expanded are
+# parked in INCONS and re-opened for the next round instead of starting
+# over. Every round, the first included, stops at the deadline; if the first
+# round is cut short the robot gets a partial path towards the goal instead.
+
+ARA_INITIAL_WEIGHT = 3.0
+ARA_WEIGHT_STEP = 0.5
+# Planner-registry default; Robot passes its own budget.
+ARA_DEFAULT_BUDGET = 0.05
+# Expansions between deadline checks.
+_ARA_CLOCK_EVERY = 256
+
+
+@dataclass
+class AnytimeResult:
+    path: Optional[List[Position]]
+    # cost(path) <= bound * optimal cost; 1.0 means optimal. inf when the
+    # path is partial (ends short of the goal) or missing.
+    bound: float
+    # Weight of the last round that ran to completion.
+    weight: float
+    rounds: int
+
+
+def ara_star_search(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    time_budget: Optional[float] = None,
+    initial_weight: float = ARA_INITIAL_WEIGHT,
+    weight_step: float = ARA_WEIGHT_STEP,
+) -> AnytimeResult:
+    """
+    Anytime Repairing A* under per-cell terrain costs.
+
+    Returns the best path found before `time_budget` seconds ran out (no
+    budget: refine until optimal) together with the suboptimality bound
+    it provably meets. If not even the first round finishes in time, the
+    path leads to the expanded cell closest to the goal (bound inf).
+    """
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    width = grid_map.width
+    height = grid_map.height
+    cells = grid_map.cells
+    costs = grid_map.costs
+    obstacle = CellType.OBSTACLE
+
+    h_scale = grid_map.min_cost()
+    gx, gy = goal
+
+    def h(index: int) -> int:
+        return h_scale * (abs(index % width - gx) + abs(index // width - gy))
+
+    start_idx = start[1] * width + start[0]
+    goal_idx = gy * width + gx
+    if cells[start] == obstacle or cells[goal] == obstacle:
+        return AnytimeResult(None, math.inf, initial_weight, 0)
+    if start_idx == goal_idx:
+        return AnytimeResult([start], 1.0, 1.0, 0)
+
+    g: Dict[int, int] = {start_idx: 0}
+    parent: Dict[int, int] = {start_idx: -1}
+    open_set = {start_idx}
+    closed = set()
+    incons = set()
+
+    weight = max(1.0, initial_weight)
+    heap = [(weight * h(start_idx), 0, start_idx)]
+
+    def improve(check_clock: bool) -> bool:
+        """
+        One weighted round; False if it stopped at the deadline.
+        """
+        expanded = 0
+        while heap:
+            key, g_cur, cur = heap[0]
+            if cur not in open_set or g_cur != g[cur]:
+                heapq.heappop(heap)
+                continue
+            if g.get(goal_idx, math.inf) <= key:
+                return True
+
+            heapq.heappop(heap)
+            open_set.discard(cur)
+            closed.add(cur)
+
+            expanded += 1
+            if check_clock and expanded % _ARA_CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+                return False
+
+            x = cur % width
+            y = cur // width
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                    continue
+                if cells[(nx, ny)] == obstacle:
+                    continue
+                nxt = ny * width + nx
+                g_next = g_cur + (1 if costs is None else costs[nxt])
+                if g_next < g.get(nxt, g_next + 1):
+                    g[nxt] = g_next
+                    parent[nxt] = cur
+                    if nxt in closed:
+                        incons.add(nxt)
+                    else:
+                        open_set.add(nxt)
+                        heapq.heappush(heap, (g_next + weight * h(nxt), g_next, nxt))
+        return True
+
+    def current_bound() -> float:
+        # Every optimal path still crosses OPEN or INCONS, so their smallest
+        # unweighted f is a lower bound on the optimal cost.
+        lower = min((g[n] + h(n) for n in open_set | incons), default=None)
+        if lower is None or lower <= 0:
+            return 1.0
+        return max(1.0, min(weight, g[goal_idx] / lower))
+
+    def extract(last: int = goal_idx) -> List[Position]:
+        path: List[Position] = []
+        cur = last
+        while cur != -1:
+            path.append((cur % width, cur // width))
+            cur = parent[cur]
+        path.reverse()
+        return path
+
+    def extract_partial() -> Optional[List[Position]]:
+        # Best cell so far: closest to the goal, cheapest to reach on ties.
+        best = min(closed, key=lambda n: (h(n), g[n]), default=start_idx)
+        path = extract(best)
+        return path if len(path) > 1 else None
+
+    if not improve(check_clock=deadline is not None):
+        return AnytimeResult(extract_partial(), math.inf, weight, 0)
+    if goal_idx not in g:
+        return AnytimeResult(None, math.inf, weight, 1)
+
+    result = AnytimeResult(extract(), current_bound(), weight, 1)
+    while result.bound > 1.0:
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+        weight = max(1.0, weight - weight_step)
+        open_set |= incons
+        incons.clear()
+        closed.clear()
+        heap = [(g[n] + weight * h(n), g[n], n) for n in open_set]
+        heapq.heapify(heap)
+
+        if not improve(check_clock=deadline is not None):
+            break
+        result = AnytimeResult(extract(), current_bound(), weight, result.rounds + 1)
+
+    return result
+
+
+def ara_star_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+) -> Optional[List[Position]]:
+    """
+    ARA* with the default time budget (planner-registry signature).
+    Registry callers expect a full path, so a partial one falls back to A*.
+    """
+    result = ara_star_search(grid_map, start, goal, ARA_DEFAULT_BUDGET)
+    if result.path is not None and result.path[-1] != goal:
+        return astar_shortest_path(grid_map, start, goal)
+    return result.path
+
+
+def anytime_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    time_budget: Optional[float],
+) -> AnytimeResult:
+    """
+    ARA* with a caller-chosen budget, measured like shortest_path calls.
+    """
+    return measure_planner("ara", ara_star_search, grid_map, start, goal, time_budget)
+
+
+register_planner("ara", ara_star_path)
+
+
+# -----------------------------
+# Sampling-based planners (RRT, RRT*, PRM)
+# -----------------------------
+# Nodes sit on cell centres. A straight edge is accepted only if every cell
+# its segment touches is free; the returned path is that same set of cells
+# walked as 4-connected steps, so the robot can follow it like any other.
+
+SAMPLING_SEED = 0
+# Sample budget: one per cell, at least MIN_SAMPLES.
+MIN_SAMPLES = 4000
+GOAL_BIAS = 0.1
+
+PRM_CELLS_PER_NODE = 16
+PRM_MAX_NODES = 2000
+PRM_NEIGHBOURS = 12
+PRM_GROW_ROUNDS = 3
+
+
+class ObstacleRows:
+    """
+    Obstacle mask as one int bitmask per row (bit x set = obstacle).
+
+    Line-of-sight tests AND a whole row span at once instead of visiting
+    cells one by one. Cached on the map through `derived`, so obstacle edits
+    flip a single bit.
+    """
+
+    def __init__(self, grid_map: GridMap):
+        self.width = grid_map.width
+        self.height = grid_map.height
+        rows = [0] * self.height
+        for (x, y), cell in grid_map.cells.items():
+            if cell == CellType.OBSTACLE:
+                rows[y] |= 1 << x
+        self.rows = rows
+
+    def cell_changed(self, grid_map: GridMap, pos: Position, old: CellType, new: CellType) -> None:
+        x, y = pos
+        if new == CellType.OBSTACLE:
+            self.rows[y] |= 1 << x
+        elif old == CellType.OBSTACLE:
+            self.rows[y] &= ~(1 << x)
+
+    def blocked(self, x: int, y: int) -> bool:
+        return bool(self.rows[y] >> x & 1)
+
+    def segment_spans(self, ax: int, ay: int, bx: int, by: int) -> Iterator[Tuple[int, int, int]]:
+        """
+        (y, x_lo, x_hi) for every row the segment between cell centres
+        (ax, ay) -> (bx, by) touches, ordered from a to b. Corner contacts
+        count as touching, so the spans are a conservative superset.
+        """
+        if ay == by:
+            yield ay, min(ax, bx), max(ax, bx)
+            return
+
+        last = self.width - 1
+        step = 1 if by > ay else -1
+        slope = (bx - ax) / (by - ay)
+        # x of the segment where it crosses the border into / out of row y.
+        x_in = float(ax)
+        for y in range(ay, by + step, step):
+            x_out = float(bx) if y == by else ax + slope * (y - ay + 0.5 * step)
+            if x_in <= x_out:
+                lo, hi = x_in, x_out
+            else:
+                lo, hi = x_out, x_in
+            yield (
+                y,
+                max(0, math.ceil(lo - 0.5 - 1e-9)),
+                min(last, math.floor(hi + 0.5 + 1e-9)),
+            )
+            x_in = x_out
+
+    def line_of_sight(self, a: Position, b: Position) -> bool:
+        rows = self.rows
+        for y, lo, hi in self.segment_spans(a[0], a[1], b[0], b[1]):
+            if rows[y] >> lo & ((1 << (hi - lo + 1)) - 1):
+                return False
+        return True
+
+    def rasterize(self, a: Position, b: Position) -> List[Position]:
+        """
+        4-connected cells from a to b, staying inside segment_spans(a, b).
+        """
+        spans = list(self.segment_spans(a[0], a[1], b[0], b[1]))
+        x = a[0]
+        cells: List[Position] = []
+        for i, (y, lo, hi) in enumerate(spans):
+            if i + 1 < len(spans):
+                _, next_lo, next_hi = spans[i + 1]
+                # Leave the row through a column shared with the next row.
+                exit_x = min(max(x, max(lo, next_lo)), min(hi, next_hi))
+            else:
+                exit_x = b[0]
+            step = 1 if exit_x >= x else -1
+            for cx in range(x, exit_x + step, step):
+                cells.append((cx, y))
+            x = exit_x
+        return cells
+
+
+def obstacle_rows(grid_map: GridMap) -> ObstacleRows:
+    rows = grid_map.derived.get("obstacle_rows")
+    if rows is None:
+        rows = ObstacleRows(grid_map)
+        grid_map.derived["obstacle_rows"] = rows
+    return rows
+
+
+class SpatialIndex:
+    """
+    Uniform bucket grid over node coordinates for nearest / radius queries.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        self.points: Dict[int, Position] = {}
+        self._lo = (0, 0)
+        self._hi = (0, 0)
+
+    def _key(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, ident: int, pos: Position) -> None:
+        self.points[ident] = pos
+        key = self._key(*pos)
+        self.buckets.setdefault(key, []).append(ident)
+        self._lo = (min(self._lo[0], key[0]), min(self._lo[1], key[1]))
+        self._hi = (max(self._hi[0], key[0]), max(self._hi[1], key[1]))
+
+    def remove(self, ident: int) -> None:
+        pos = self.points.pop(ident)
+        bucket = self.buckets[self._key(*pos)]
+        bucket.remove(ident)
+
+    def nearest(self, pos: Position) -> Optional[int]:
+        if not self.points:
+            return None
+        kx, ky = self._key(*pos)
+        # Rings beyond this cover no bucket that was ever used.
+        last_ring = max(
+            abs(kx - self._lo[0]), abs(kx - self._hi[0]),
+            abs(ky - self._lo[1]), abs(ky - self._hi[1]),
+        )
+        best: Optional[int] = None
+        best_d2 = math.inf
+        for ring in range(last_ring + 1):
+            for bx in range(kx - ring, kx + ring + 1):
+                edge = bx in (kx - ring, kx + ring)
+                for by in range(ky - ring, ky + ring + 1, 1 if edge else 2 * ring or 1):
+                    for ident in self.buckets.get((bx, by), ()):
+                        px, py = self.points[ident]
+                        d2 = (px - pos[0]) ** 2 + (py - pos[1]) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = ident, d2
+            # Anything in a farther ring is at least ring * cell_size away.
+            if best is not None and best_d2 <= (ring * self.cell_size) ** 2:
+                break
+        return best
+
+    def within(self, pos: Position, radius: float) -> List[int]:
+        reach = int(math.ceil(radius / self.cell_size))
+        kx, ky = self._key(*pos)
+        r2 = radius * radius
+        found = []
+        for bx in range(kx - reach, kx + reach + 1):
+            for by in range(ky - reach, ky + reach + 1):
+                for ident in self.buckets.get((bx, by), ()):
+                    px, py = self.points[ident]
+                    if (px - pos[0]) ** 2 + (py - pos[1]) ** 2 <= r2:
+                        found.append(ident)
+        return found
+
+
+def _euclid(a: Position, b: Position) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _step_length(grid_map: GridMap) -> float:
+    return max(2.0, 0.05 * (grid_map.width + grid_map.height))
+
+
+def _sample_free(grid_map: GridMap, rows: ObstacleRows, rng: random.Random) -> Position:
+    while True:
+        x = rng.randrange(grid_map.width)
+        y = rng.randrange(grid_map.height)
+        if not rows.blocked(x, y):
+            return x, y
+
+
+def _steer(
+    grid_map: GridMap,
+    rows: ObstacleRows,
+    src: Position,
+    dst: Position,
+    step: float,
+) -> Optional[Position]:
+    """
+    Cell up to `step` from src towards dst with a clear line from src,
+    halving the step when the full one is blocked.
+    """
+    dist = _euclid(src, dst)
+    reach = min(step, dist)
+    while reach >= 1.0:
+        t = reach / dist
+        x = int(round(src[0] + (dst[0] - src[0]) * t))
+        y = int(round(src[1] + (dst[1] - src[1]) * t))
+        new = (
+            min(max(x, 0), grid_map.width - 1),
+            min(max(y, 0), grid_map.height - 1),
+        )
+        if new != src and not rows.blocked(*new) and rows.line_of_sight(src, new):
+            return new
+        reach /= 2
+    return None
+
+
+def _polyline_to_cells(rows: ObstacleRows, polyline: List[Position]) -> List[Position]:
+    path: List[Position] = [polyline[0]]
+    for a, b in zip(polyline, polyline[1:]):
+        for cell in rows.rasterize(a, b):
+            if cell != path[-1]:
+                path.append(cell)
+    return path
+
+
+def _tree_path(nodes: List[Position], parent: List[int], last: int) -> List[Position]:
+    chain: List[Position] = []
+    cur = last
+    while cur != -1:
+        chain.append(nodes[cur])
+        cur = parent[cur]
+    chain.reverse()
+    return chain
+
+
+def rrt_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    seed: int = SAMPLING_SEED,
+    max_samples: Optional[int] = None,
+) -> Optional[List[Position]]:
+    """
+    Rapidly-exploring random tree with goal bias. Not optimal; reproducible
+    for a given seed.
+    """
+    rows = obstacle_rows(grid_map)
+    if rows.blocked(*start) or rows.blocked(*goal):
+        return None
+    if rows.line_of_sight(start, goal):
+        return rows.rasterize(start, goal)
+
+    if max_samples is None:
+        max_samples = max(MIN_SAMPLES, grid_map.width * grid_map.height)
+    rng = random.Random(seed)
+    step = _step_length(grid_map)
+    index = SpatialIndex(step)
+    nodes: List[Position] = [start]
+    parent: List[int] = [-1]
+    index.insert(0, start)
+    seen = {start}
+
+    for _ in range(max_samples):
+        sample = goal if rng.random() < GOAL_BIAS else _sample_free(grid_map, rows, rng)
+        near = index.nearest(sample)
+        new = _steer(grid_map, rows, nodes[near], sample, step)
+        if new is None or new in seen:
+            continue
+
+        nodes.append(new)
+        parent.append(near)
+        index.insert(len(nodes) - 1, new)
+        seen.add(new)
+
+        if _euclid(new, goal) <= step and rows.line_of_sight(new, goal):
+            if new != goal:
+                nodes.append(goal)
+                parent.append(len(nodes) - 2)
+            return _polyline_to_cells(rows, _tree_path(nodes, parent, len(nodes) - 1))
+
+    return None
+
+
+def rrt_star_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+    seed: int = SAMPLING_SEED,
+    max_samples: Optional[int] = None,
+) -> Optional[List[Position]]:
+    """
+    RRT* : like RRT, but each new node picks the cheapest parent among its
+    neighbours and rewires them through itself. Keeps refining for a while
+    after the goal is first reached.
+    """
+    rows = obstacle_rows(grid_map)
+    if rows.blocked(*start) or rows.blocked(*goal):
+        return None
+    if rows.line_of_sight(start, goal):
+        return rows.rasterize(start, goal)
+
+    if max_samples is None:
+        max_samples = max(MIN_SAMPLES, grid_map.width * grid_map.height)
+    rng = random.Random(seed)
+    step = _step_length(grid_map)
+    radius = 1.5 * step
+    index = SpatialIndex(step)
+    nodes: List[Position] = [start]
+    parent: List[int] = [-1]
+    cost: List[float] = [0.0]
+    index.insert(0, start)
+    seen = {start: 0}
+
+    goal_node: Optional[int] = None
+    refine_left: Optional[int] = None
+
+    for _ in range(max_samples):
+        if refine_left is not None:
+            if refine_left <= 0:
+                break
+            refine_left -= 1
+
+        sample = goal if rng.random() < GOAL_BIAS else _sample_free(grid_map, rows, rng)
+        near = index.nearest(sample)
+        new = _steer(grid_map, rows, nodes[near], sample, step)
+        if new is None or new in seen:
+            continue
+
+        neighbours = index.within(new, radius)
+        best_parent = near
+        best_cost = cost[near] + _euclid(nodes[near], new)
+        # Cheapest candidate first: the first one in sight is the parent.
+        candidates = sorted((cost[n] + _euclid(nodes[n], new), n) for n in neighbours)
+        for c, n in candidates:
+            if c >= best_cost:
+                break
+            if rows.line_of_sight(nodes[n], new):
+                best_parent, best_cost = n, c
+                break
+
+        ident = len(nodes)
+        nodes.append(new)
+        parent.append(best_parent)
+        cost.append(best_cost)
+        index.insert(ident, new)
+        seen[new] = ident
+
+        for n in neighbours:
+            c = best_cost + _euclid(new, nodes[n])
+            if c < cost[n] and rows.line_of_sight(new, nodes[n]):
+                # Rewire; descendants keep stale costs, which only makes
+                # later comparisons conservative.
+                parent[n] = ident
+                cost[n] = c
+
+        if new == goal:
+            goal_node = ident
+        elif goal_node is None and _euclid(new, goal) <= step and rows.line_of_sight(new, goal):
+            goal_node = len(nodes)
+            nodes.append(goal)
+            parent.append(ident)
+            cost.append(best_cost + _euclid(new, goal))
+            index.insert(goal_node, goal)
+            seen[goal] = goal_node
+
+        if goal_node is not None and refine_left is None:
+            refine_left = max_samples // 4
+
+    if goal_node is None:
+        return None
+    return _polyline_to_cells(rows, _tree_path(nodes, parent, goal_node))
+
+
+class PRMRoadmap:
+    """
+    Probabilistic roadmap reused across queries on the same map.
+
+    Built once per map (seeded), attached through `derived`, and repaired
+    locally when a cell changes: a new obstacle drops the nodes on it and
+    the edges whose segments touch it; a freed cell gets a node and tries to
+    reconnect the nodes around it. Only nodes within one connection radius
+    of the edited cell are touched.
+
+    A query that finds no route grows the roadmap with more samples (from
+    the same seeded stream) before giving up, so narrow passages get filled
+    in where they are actually needed.
+    """
+
+    def __init__(self, grid_map: GridMap, seed: int = SAMPLING_SEED):
+        self.rows = obstacle_rows(grid_map)
+        area = grid_map.width * grid_map.height
+        target = min(PRM_MAX_NODES, max(16, area // PRM_CELLS_PER_NODE))
+        # Sized so a node sees about PRM_NEIGHBOURS others on an open map.
+        self.radius = max(2.0, math.sqrt(PRM_NEIGHBOURS * area / (math.pi * target)))
+        self.index = SpatialIndex(self.radius)
+        self.nodes: Dict[int, Position] = {}
+        self.edges: Dict[int, Dict[int, float]] = {}
+        self._next_id = 0
+        self._placed: Dict[Position, int] = {}
+        self._rng = random.Random(seed)
+        self._grow(grid_map, target)
+
+    def _grow(self, grid_map: GridMap, count: int) -> None:
+        added = 0
+        for _ in range(count * 4):
+            if added >= count:
+                break
+            pos = _sample_free(grid_map, self.rows, self._rng)
+            if pos not in self._placed:
+                self._add_node(pos)
+                added += 1
+
+    def _add_node(self, pos: Position) -> int:
+        ident = self._next_id
+        self._next_id += 1
+        self.nodes[ident] = pos
+        self._placed[pos] = ident
+        self.edges[ident] = {}
+        self.index.insert(ident, pos)
+        self._connect(ident)
+        return ident
+
+    def _connect(self, ident: int) -> None:
+        pos = self.nodes[ident]
+        for other in self.index.within(pos, self.radius):
+            if other == ident or other in self.edges[ident]:
+                continue
+            if self.rows.line_of_sight(pos, self.nodes[other]):
+                d = _euclid(pos, self.nodes[other])
+                self.edges[ident][other] = d
+                self.edges[other][ident] = d
+
+    def _remove_node(self, ident: int) -> None:
+        for other in self.edges.pop(ident):
+            self.edges[other].pop(ident, None)
+        self.index.remove(ident)
+        del self._placed[self.nodes.pop(ident)]
+
+    def cell_changed(self, grid_map: GridMap, pos: Position, old: CellType, new: CellType) -> None:
+        # An edge through pos has both ends within its length (+ the corner
+        # slack of the line-of-sight test) of pos.
+        reach = self.radius + 1.0
+        if new == CellType.OBSTACLE:
+            if pos in self._placed:
+                self._remove_node(self._placed[pos])
+            for ident in self.index.within(pos, reach):
+                a = self.nodes[ident]
+                for other in list(self.edges[ident]):
+                    if not self.rows.line_of_sight(a, self.nodes[other]):
+                        del self.edges[ident][other]
+                        self.edges[other].pop(ident, None)
+        elif old == CellType.OBSTACLE:
+            if pos not in self._placed:
+                self._add_node(pos)
+            for ident in self.index.within(pos, reach):
+                self._connect(ident)
+
+    def query(self, grid_map: GridMap, start: Position, goal: Position) -> Optional[List[Position]]:
+        rows = self.rows
+        if rows.blocked(*start) or rows.blocked(*goal):
+            return None
+        if rows.line_of_sight(start, goal):
+            return rows.rasterize(start, goal)
+
+        for _ in range(PRM_GROW_ROUNDS):
+            path = self._search(start, goal)
+            if path is not None:
+                return path
+            self._grow(grid_map, max(16, len(self.nodes) // 2))
+        return self._search(start, goal)
+
+    def _search(self, start: Position, goal: Position) -> Optional[List[Position]]:
+        rows = self.rows
+
+        # Temporary attachments of start/goal to visible roadmap nodes.
+        def attach(pos: Position) -> Dict[int, float]:
+            links = {}
+            for ident in self.index.within(pos, self.radius):
+                if rows.line_of_sight(pos, self.nodes[ident]):
+                    links[ident] = _euclid(pos, self.nodes[ident])
+            return links
+
+        start_links = attach(start)
+        goal_links = attach(goal)
+        if not start_links or not goal_links:
+            return None
+
+        # A* over the roadmap; -1 / -2 stand for start / goal.
+        best: Dict[int, float] = {-1: 0.0}
+        came: Dict[int, int] = {}
+        heap = [(_euclid(start, goal), 0.0, -1)]
+        while heap:
+            _, g_cur, cur = heapq.heappop(heap)
+            if g_cur > best.get(cur, math.inf):
+                continue
+            if cur == -2:
+                break
+            links = start_links if cur == -1 else self.edges[cur]
+            for nxt, w in links.items():
+                self._relax(heap, best, came, cur, nxt, g_cur + w, goal)
+            if cur in goal_links:
+                self._relax(heap, best, came, cur, -2, g_cur + goal_links[cur], goal)
+
+        if -2 not in best:
+            return None
+
+        polyline = [goal]
+        cur = came[-2]
+        while cur != -1:
+            polyline.append(self.nodes[cur])
+            cur = came[cur]
+        polyline.append(start)
+        polyline.reverse()
+        return _polyline_to_cells(rows, polyline)
+
+    def _relax(self, heap, best, came, cur: int, nxt: int, g_next: float, goal: Position) -> None:
+        if g_next < best.get(nxt, math.inf):
+            best[nxt] = g_next
+            came[nxt] = cur
+            pos = goal if nxt == -2 else self.nodes[nxt]
+            heapq.heappush(heap, (g_next + _euclid(pos, goal), g_next, nxt))
+
+
+def prm_roadmap(grid_map: GridMap) -> PRMRoadmap:
+    roadmap = grid_map.derived.get("prm")
+    if roadmap is None:
+        # Build the row mask first so it is repaired before the roadmap
+        # when a cell changes.
+        obstacle_rows(grid_map)
+        roadmap = PRMRoadmap(grid_map)
+        grid_map.derived["prm"] = roadmap
+    return roadmap
+
+
+def prm_path(
+    grid_map: GridMap,
+    start: Position,
+    goal: Position,
+) -> Optional[List[Position]]:
+    """
+    Query the map's persistent PRM roadmap (built on first use).
+    """
+    return prm_roadmap(grid_map).query(grid_map, start, goal)
+
+
+register_planner("rrt", rrt_path)
+register_planner("rrt_star", rrt_star_path)
+register_planner("prm", prm_path)
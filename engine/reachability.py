@@ -0,0 +1,157 @@
+# reachability.py
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from engine.Map_gen import CellType, GridMap
+
+Position = Tuple[int, int]
+
+
+class ReachabilityEngine:
+    """
+    Yes/no connectivity checks for one map size.
+
+    Runs a bidirectional BFS that stops as soon as the two frontiers touch.
+    No path is rebuilt and no parent links are stored: visited state lives in
+    a flat epoch-stamped array that is reused across calls, so a check costs
+    only the cells it actually touches.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._marks: List[int] = [0] * (width * height)
+        self._epoch = 0
+
+    def _next_stamps(self) -> Tuple[int, int]:
+        # Two fresh stamps per call: one per search side. Older stamps are
+        # simply never equal to the new ones, so nothing has to be cleared.
+        self._epoch += 2
+        return self._epoch - 1, self._epoch
+
+    def connected(self, grid_map: GridMap, start: Position, goal: Position) -> bool:
+        width = self.width
+        height = self.height
+        cells = grid_map.cells
+        obstacle = CellType.OBSTACLE
+        marks = self._marks
+
+        if cells[start] == obstacle or cells[goal] == obstacle:
+            return False
+        if start == goal:
+            return True
+
+        fwd, bwd = self._next_stamps()
+        sx, sy = start
+        gx, gy = goal
+        marks[sy * width + sx] = fwd
+        marks[gy * width + gx] = bwd
+
+        front: List[Position] = [start]
+        back: List[Position] = [goal]
+        own, other = fwd, bwd
+
+        while front and back:
+            # Always grow the smaller frontier by one full level.
+            if len(front) > len(back):
+                front, back = back, front
+                own, other = other, own
+
+            next_level: List[Position] = []
+            for x, y in front:
+                for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                        continue
+                    idx = ny * width + nx
+                    mark = marks[idx]
+                    if mark == own:
+                        continue
+                    if mark == other:
+                        return True
+                    if cells[(nx, ny)] == obstacle:
+                        continue
+                    marks[idx] = own
+                    next_level.append((nx, ny))
+            front = next_level
+
+        return False
+
+
+_local = threading.local()
+
+# Map sizes each thread keeps an engine for. Every engine holds a W*H mark
+# array, so the least recently used size is dropped beyond this.
+ENGINES_PER_THREAD = 4
+
+# Engines allocated ahead of time (see preallocate_engines); a thread that
+# needs an engine for one of these sizes takes a spare instead of building
+# its scratch buffers on the request path.
+_spares: Dict[Tuple[int, int], List[ReachabilityEngine]] = {}
+_spares_lock = threading.Lock()
+
+
+def preallocate_engines(width: int, height: int, count: int) -> None:
+    """
+    Keep `count` ready engines for this map size, shared by all threads.
+    """
+    key = (width, height)
+    with _spares_lock:
+        pool = _spares.setdefault(key, [])
+        while len(pool) < count:
+            pool.append(ReachabilityEngine(width, height))
+
+
+def get_engine(width: int, height: int) -> ReachabilityEngine:
+    """
+    Per-thread LRU of engines keyed by map size, so concurrent request
+    handlers never share scratch buffers.
+    """
+    engines: Optional["OrderedDict[Tuple[int, int], ReachabilityEngine]"] = getattr(_local, "engines", None)
+    if engines is None:
+        engines = OrderedDict()
+        _local.engines = engines
+
+    key = (width, height)
+    engine = engines.get(key)
+    if engine is not None:
+        engines.move_to_end(key)
+        return engine
+
+    with _spares_lock:
+        pool = _spares.get(key)
+        engine = pool.pop() if pool else None
+    if engine is None:
+        engine = ReachabilityEngine(width, height)
+    engines[key] = engine
+    if len(engines) > ENGINES_PER_THREAD:
+        engines.popitem(last=False)
+    return engine
+
+
+def is_reachable(
+    grid_map: GridMap,
+    start: Optional[Position] = None,
+    goal: Optional[Position] = None,
+) -> bool:
+    """
+    True if goal can be reached from start (defaults: map start/end).
+    """
+    engine = get_engine(grid_map.width, grid_map.height)
+    return engine.connected(
+        grid_map,
+        grid_map.start if start is None else start,
+        grid_map.end if goal is None else goal,
+    )
+
+
+def route_exists(grid_map: GridMap) -> bool:
+    """
+    True if the map start can still reach the end and every waypoint.
+    Same as is_reachable for maps without waypoints.
+    """
+    engine = get_engine(grid_map.width, grid_map.height)
+    start = grid_map.start
+    if not engine.connected(grid_map, start, grid_map.end):
+        return False
+    return all(engine.connected(grid_map, start, waypoint) for waypoint in grid_map.waypoints)
@@ -1,50 +1,153 @@
 # robot.py
 
-from typing import Tuple
+from typing import List, Optional, Sequence, Tuple
 from engine.Map_gen import GridMap
-from engine.pathfinding import shortest_path
+from engine.missions import Mission
+from engine.pathfinding import anytime_path, shortest_path
 
 Position = Tuple[int, int]
 
 
 class Robot:
-    def __init__(self, grid_map: GridMap, planner: str = "bfs"):
+    def __init__(
+        self,
+        grid_map: GridMap,
+        planner: str = "bfs",
+        waypoints: Optional[Sequence[Position]] = None,
+        time_budget: Optional[float] = None,
+    ):
         self.grid_map = grid_map
         self.position: Position = grid_map.start
         self.end: Position = grid_map.end
         self.planner = planner
 
+        # Seconds per planning call. When set, the robot plans with anytime
+        # ARA* instead of `planner` and records the bound it reached.
+        self.time_budget = time_budget
+        self.last_bound: Optional[float] = None
+
+        # Waypoints default to the ones stored on the map.
+        if waypoints is None:
+            waypoints = grid_map.waypoints
+        self.mission: Optional[Mission] = Mission(waypoints) if waypoints else None
+
         # Fixed initial battery for current game balancing.
         self.battery: int = 21
 
     # -----------------------------
     # Public API
     # -----------------------------
-    def move(self) -> bool:
+    def current_target(self, grid_map: Optional[GridMap] = None) -> Position:
         """
-        Robot takes one step toward the end.
-        Returns True if move was successful.
-        Returns False if robot cannot move (battery empty).
+        Next waypoint in the mission's optimized order, or the end.
+        Updates the mission's cached order; use peek_target for what-ifs.
         """
+        if self.mission is None or self.mission.complete:
+            return self.end
+        return self.mission.next_target(
+            self.grid_map if grid_map is None else grid_map,
+            self.position,
+            self.end,
+        )
 
-        if self.battery <= 0:
-            return False
+    def peek_target(self, grid_map: Optional[GridMap] = None) -> Position:
+        """
+        Same target as current_target, without touching mission state.
+        """
+        if self.mission is None or self.mission.complete:
+            return self.end
+        return self.mission.peek_target(
+            self.grid_map if grid_map is None else grid_map,
+            self.position,
+            self.end,
+        )
+
+    def plan_path(
+        self,
+        grid_map: Optional[GridMap] = None,
+        target: Optional[Position] = None,
+    ) -> Tuple[Optional[List[Position]], Optional[float]]:
+        """
+        Path to target (default: the current target) and its suboptimality
+        bound (None when the planner does not report one). With a time
+        budget this is the best path ARA* found before the deadline, which
+        may stop short of the target (bound inf) on large maps.
+        """
+        grid_map = self.grid_map if grid_map is None else grid_map
+        if target is None:
+            target = self.current_target(grid_map)
+        if self.time_budget is not None:
+            result = anytime_path(grid_map, self.position, target, self.time_budget)
+            return result.path, result.bound
 
         path = shortest_path(
-            grid_map=self.grid_map,
+            grid_map=grid_map,
             start=self.position,
-            goal=self.end,
+            goal=target,
             algorithm=self.planner,
         )
+        return path, None
+
+    def plan_step(self, grid_map: Optional[GridMap] = None) -> Optional[Position]:
+        """
+        Next cell the robot would step into on grid_map (default: its own map).
+        Changes no robot or mission state, so it can be evaluated
+        speculatively, even from another thread.
+        Returns None if the robot is already at the end or has no path.
+        """
+        path, _ = self.plan_path(grid_map, self.peek_target(grid_map))
+
+        if path is None or len(path) < 2:
+            return None
+        return path[1]
+
+    def next_step(self) -> Optional[Position]:
+        """
+        Next cell for the robot's real turn on its own map. Like plan_step,
+        but keeps the mission's cached order current.
+        """
+        path, _ = self.plan_path()
+
+        if path is None or len(path) < 2:
+            return None
+        return path[1]
+
+    def apply_step(self, step: Position) -> bool:
+        """
+        Enter step, draining its terrain cost (1 on uniform maps).
+        Returns False, leaving the robot in place, if the battery cannot
+        pay for the cell.
+        """
+        cost = self.grid_map.cost(step)
+        if cost > self.battery:
+            return False
+        self.position = step
+        self.battery -= cost
+        if self.mission is not None:
+            self.mission.visit(step)
+        return True
+
+    def move(self) -> bool:
+        """
+        Robot takes one step toward the end.
+        Returns True if move was successful.
+        Returns False if robot cannot move (battery empty or too low for
+        the next cell).
+        """
 
+        if self.battery <= 0:
+            return False
+
+        path, self.last_bound = self.plan_path()
         if path is None or len(path) < 2:
             # already at end or no path (should not happen)
             return False
+        step = path[1]
 
         # move one step
-        self.position = path[1]
-        self.battery -= 1
-        return True
+        return self.apply_step(step)
 
     def reached_end(self) -> bool:
+        if self.mission is not None and not self.mission.complete:
+            return False
         return self.position == self.end
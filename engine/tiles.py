@@ -0,0 +1,291 @@
+# tiles.py
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from engine.Map_gen import CellType
+
+Position = Tuple[int, int]
+
+# File layout: one header page, then fixed-size square tiles stored
+# tile-row-major, each tile row-major inside and padded to whole pages so a
+# tile can be dropped from memory on its own. One byte per cell.
+MAGIC = b"PWTILES1"
+_HEADER = struct.Struct("<8sIIIiiii")
+DEFAULT_TILE_SIZE = 64
+DEFAULT_CACHE_TILES = 256
+
+_CODE_OF = {
+    CellType.EMPTY: 0,
+    CellType.OBSTACLE: 1,
+    CellType.START: 2,
+    CellType.END: 3,
+}
+_CELL_OF = (CellType.EMPTY, CellType.OBSTACLE, CellType.START, CellType.END)
+
+
+def _round_up(value: int, multiple: int) -> int:
+    return -(-value // multiple) * multiple
+
+
+class TileCells:
+    """
+    Read/write cell mapping over a TiledMap, shaped like GridMap.cells.
+
+    Lookups go to the owning tile, so only tiles a caller actually touches
+    are ever paged in. Iteration walks the whole map and is only meant for
+    small maps and debugging.
+    """
+
+    def __init__(self, tiled: "TiledMap"):
+        self._tiled = tiled
+
+    def __getitem__(self, pos: Position) -> CellType:
+        return _CELL_OF[self._tiled.code(pos)]
+
+    def __setitem__(self, pos: Position, cell: CellType) -> None:
+        self._tiled.write_code(pos, _CODE_OF[cell])
+
+    def __contains__(self, pos: object) -> bool:
+        try:
+            x, y = pos  # type: ignore[misc]
+        except (TypeError, ValueError):
+            return False
+        return self._tiled.in_bounds(x, y)
+
+    def __len__(self) -> int:
+        return self._tiled.width * self._tiled.height
+
+    def __iter__(self) -> Iterator[Position]:
+        for y in range(self._tiled.height):
+            for x in range(self._tiled.width):
+                yield x, y
+
+    def get(self, pos: Position, default: Any = None) -> Any:
+        return self[pos] if pos in self else default
+
+    def keys(self) -> Iterator[Position]:
+        return iter(self)
+
+    def values(self) -> Iterator[CellType]:
+        return (self[pos] for pos in self)
+
+    def items(self) -> Iterator[Tuple[Position, CellType]]:
+        return ((pos, self[pos]) for pos in self)
+
+
+class TiledMap:
+    """
+    Disk-backed grid for maps too large to hold as a GridMap.
+
+    Cells live in a memory-mapped file split into fixed-size tiles. A tile
+    is mapped in the first time a cell in it is read or written and kept in
+    an LRU cache of `cache_tiles` tiles; evicted tiles are released back to
+    the OS, so resident memory follows the region being searched rather
+    than the map size. Writes land directly in the mapped tile (write-
+    through), and opening a map only reads the header.
+
+    Exposes the GridMap surface the planners use (width, height, start,
+    end, cells, in_bounds, cost, set_cell, derived), so bfs/dijkstra/astar
+    run on it unchanged. Terrain costs are uniform. Structures that allocate
+    per-cell arrays for the whole map (reachability marks, distance fields,
+    clearance) are not meant for tiled maps.
+    """
+
+    def __init__(self, path: str, cache_tiles: int = DEFAULT_CACHE_TILES, writable: bool = True):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=access)
+
+        magic, width, height, tile_size, sx, sy, ex, ey = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            # close() expects a fully built map; only the file is open here.
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"{path} is not a tiled map")
+
+        self.width = width
+        self.height = height
+        self.start: Position = (sx, sy)
+        self.end: Position = (ex, ey)
+        self.tile_size = tile_size
+        self.waypoints: List[Position] = []
+        self.costs = None
+        self.derived: Dict[Any, Any] = {}
+        self.cells = TileCells(self)
+
+        self._shift = tile_size.bit_length() - 1
+        self._mask = tile_size - 1
+        self._tiles_x = -(-width // tile_size)
+        self._data_offset, self._stride = _layout(tile_size)
+
+        self.cache_tiles = max(1, cache_tiles)
+        self._cache: "OrderedDict[int, memoryview]" = OrderedDict()
+        # Last tile used; consecutive lookups in one tile skip the LRU.
+        self._hot_id = -1
+        self._hot: Optional[memoryview] = None
+        self.tile_loads = 0
+
+    # -----------------------------
+    # Creation
+    # -----------------------------
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        width: int,
+        height: int,
+        start: Position,
+        end: Position,
+        obstacles: Iterable[Position] = (),
+        tile_size: int = DEFAULT_TILE_SIZE,
+        cache_tiles: int = DEFAULT_CACHE_TILES,
+    ) -> "TiledMap":
+        """
+        Create an empty map file (sparse on disk, so this is O(1) in the map
+        size) and place start, end and the given obstacles.
+        """
+        if width < 2 or height < 2:
+            raise ValueError("Map must be at least 2x2")
+        if tile_size <= 0 or tile_size & (tile_size - 1):
+            raise ValueError("tile_size must be a power of two")
+
+        data_offset, stride = _layout(tile_size)
+        tiles = -(-width // tile_size) * -(-height // tile_size)
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, width, height, tile_size, *start, *end))
+            f.truncate(data_offset + tiles * stride)
+
+        tiled = cls(path, cache_tiles=cache_tiles)
+        tiled.set_cell(start, CellType.START)
+        tiled.set_cell(end, CellType.END)
+        for pos in obstacles:
+            tiled.set_cell(pos, CellType.OBSTACLE)
+        return tiled
+
+    @classmethod
+    def open(cls, path: str, cache_tiles: int = DEFAULT_CACHE_TILES, writable: bool = True) -> "TiledMap":
+        return cls(path, cache_tiles=cache_tiles, writable=writable)
+
+    # -----------------------------
+    # Tile cache
+    # -----------------------------
+    def _tile(self, tile_id: int) -> memoryview:
+        if tile_id == self._hot_id:
+            return self._hot  # type: ignore[return-value]
+
+        cache = self._cache
+        tile = cache.get(tile_id)
+        if tile is None:
+            offset = self._data_offset + tile_id * self._stride
+            tile = memoryview(self._mm)[offset:offset + self.tile_size * self.tile_size]
+            cache[tile_id] = tile
+            self.tile_loads += 1
+            if len(cache) > self.cache_tiles:
+                self._evict(*cache.popitem(last=False))
+        else:
+            cache.move_to_end(tile_id)
+
+        self._hot_id = tile_id
+        self._hot = tile
+        return tile
+
+    def _evict(self, tile_id: int, tile: memoryview) -> None:
+        tile.release()
+        if tile_id == self._hot_id:
+            self._hot_id = -1
+            self._hot = None
+        # Drop the tile's pages from this process; dirty pages stay in the
+        # page cache and are written back by the OS.
+        if hasattr(self._mm, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+            self._mm.madvise(mmap.MADV_DONTNEED, self._data_offset + tile_id * self._stride, self._stride)
+
+    @property
+    def resident_tiles(self) -> int:
+        return len(self._cache)
+
+    def tile_of(self, pos: Position) -> int:
+        return (pos[1] >> self._shift) * self._tiles_x + (pos[0] >> self._shift)
+
+    # -----------------------------
+    # Cell access
+    # -----------------------------
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def code(self, pos: Position) -> int:
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise KeyError(pos)
+        shift = self._shift
+        mask = self._mask
+        tile = self._tile((y >> shift) * self._tiles_x + (x >> shift))
+        return tile[((y & mask) << shift) | (x & mask)]
+
+    def write_code(self, pos: Position, code: int) -> None:
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise KeyError(pos)
+        shift = self._shift
+        mask = self._mask
+        tile = self._tile((y >> shift) * self._tiles_x + (x >> shift))
+        tile[((y & mask) << shift) | (x & mask)] = code
+
+    def cost(self, pos: Position) -> int:
+        return 1
+
+    def max_cost(self) -> int:
+        return 1
+
+    def min_cost(self) -> int:
+        return 1
+
+    def set_cell(self, pos: Position, cell: CellType) -> None:
+        """
+        Write one cell through to its tile and notify derived structures.
+        """
+        old = self.cells[pos]
+        if old == cell:
+            return
+        self.write_code(pos, _CODE_OF[cell])
+        for structure in list(self.derived.values()):
+            structure.cell_changed(self, pos, old, cell)
+
+    # -----------------------------
+    # Lifetime
+    # -----------------------------
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def close(self) -> None:
+        for tile in self._cache.values():
+            tile.release()
+        self._cache.clear()
+        self._hot_id = -1
+        self._hot = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "TiledMap":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"TiledMap({self.width}x{self.height}, start={self.start}, end={self.end}, "
+            f"tile={self.tile_size}, resident={self.resident_tiles}, path={os.path.basename(self.path)!r})"
+        )
+
+
+def _layout(tile_size: int) -> Tuple[int, int]:
+    """
+    (offset of the first tile, bytes per tile) with both page-aligned.
+    """
+    page = mmap.PAGESIZE
+    return _round_up(_HEADER.size, page), _round_up(tile_size * tile_size, page)
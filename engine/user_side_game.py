@@ -1,10 +1,9 @@
 # user_side.py
 
 from typing import Tuple, Set
-from rich.console import Console
-from Map_gen import GridMap, CellType
-from Obstacles import ObstacleManager
-from robot import Robot
+from engine.Map_gen import GridMap, CellType, get_console
+from engine.Obstacles import ObstacleManager
+from engine.robot import Robot
 
 Position = Tuple[int, int]
 
@@ -15,7 +14,7 @@ class UserSide:
         self.obstacles = obstacle_manager
         self.cursor: Position = (0, 0)
         self.turn_counter = 0
-        self.console = Console()
+        self.console = get_console()
         self.last_obstacle_move = None
 
 
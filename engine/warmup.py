@@ -0,0 +1,97 @@
+# warmup.py
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from engine.Map_gen import CellType, GridMap, generate_map, make_costs
+from engine.Obstacles import ObstacleManager
+from engine.pathfinding import anytime_path, shortest_path
+from engine.reachability import preallocate_engines, route_exists
+from engine.robot import Robot
+
+Size = Tuple[int, int]
+
+
+def parse_sizes(spec: str) -> List[Size]:
+    """
+    "20x20,80x80" -> [(20, 20), (80, 80)]; malformed entries are skipped.
+    """
+    sizes: List[Size] = []
+    for part in spec.split(","):
+        width, _, height = part.strip().lower().partition("x")
+        try:
+            size = (int(width), int(height))
+        except ValueError:
+            continue
+        if size[0] >= 4 and size[1] >= 4:
+            sizes.append(size)
+    return sizes
+
+
+def parse_count(spec: str, default: int) -> int:
+    """
+    Non-negative integer setting; default when malformed.
+    """
+    try:
+        return max(0, int(spec.strip()))
+    except ValueError:
+        return default
+
+
+# Map sizes worth having warm buffers for (the frontend's common sizes),
+# and how many reachability engines to keep ready per size (roughly one
+# per request thread that will see that size).
+WARM_SIZES = parse_sizes(os.environ.get("PATHWATCH_WARM_SIZES", "20x20,40x40,80x80"))
+WARM_ENGINES = parse_count(os.environ.get("PATHWATCH_WARM_ENGINES", "8"), 8)
+
+
+def sample_map(width: int, height: int) -> GridMap:
+    """
+    Map with a wall that has one gap and a waypoint behind the start, so a
+    warmup pass takes the same non-trivial branches real games do.
+    """
+    grid_map = generate_map(width, height)
+    wall_x = width // 2
+    for y in range(height - 1):
+        grid_map.cells[(wall_x, y)] = CellType.OBSTACLE
+    grid_map.waypoints = [(1, height - 1)]
+    return grid_map
+
+
+def warm_up(
+    sizes: Optional[Sequence[Size]] = None,
+    engines: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Preallocate search buffers and run one pass of every planner path the
+    server uses on sample maps. Returns timings in milliseconds.
+    """
+    sizes = WARM_SIZES if sizes is None else sizes
+    engines = WARM_ENGINES if engines is None else engines
+    timings: Dict[str, float] = {}
+
+    started = time.perf_counter()
+    for width, height in sizes:
+        preallocate_engines(width, height, engines)
+    timings["preallocate_ms"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for width, height in sizes:
+        grid_map = sample_map(width, height)
+        route_exists(grid_map)
+        shortest_path(grid_map, grid_map.start, grid_map.end, "bfs")
+        anytime_path(grid_map, grid_map.start, grid_map.end, 0.005)
+
+        # Mission ordering, distance fields and a transactional move.
+        Robot(grid_map).move()
+        manager = ObstacleManager(
+            grid_map,
+            (pos for pos, cell in grid_map.cells.items() if cell == CellType.OBSTACLE),
+        )
+        manager.move_obstacle((width // 2, 0), (width // 2 + 1, 0))
+
+        grid_map.costs = make_costs(width, height, {(0, 1): 3, (1, 0): 2})
+        Robot(grid_map, planner="astar").move()
+    timings["planning_ms"] = (time.perf_counter() - started) * 1000
+
+    return timings
@@ -0,0 +1,317 @@
+"""
+Load generator that replays realistic game sessions against the API.
+
+Each simulated client does what the frontend does: /start-game, then
+alternates /legal-obstacle-moves, /move-obstacle and /next-move until the
+game is over or the turn limit is hit.
+
+    # in-process, against the ASGI app (no network)
+    python -m server.loadtest --sessions 2000 --concurrency 200 --size 80
+
+    # against a local uvicorn server, sampling its RSS
+    python -m server.loadtest --url http://127.0.0.1:8000 --server-pid 12345
+
+Requires httpx (pip install -r requirements-dev.txt); psutil is used for RSS
+if installed.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from engine.Map_gen import generate_map, CellType
+from engine.memory import process_rss
+from engine.reachability import is_reachable
+
+Position = Tuple[int, int]
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+@dataclass
+class LoadReport:
+    endpoints: Dict[str, EndpointStats] = field(default_factory=dict)
+    rss_samples: List[Tuple[float, int]] = field(default_factory=list)
+    sessions_done: int = 0
+    sessions_failed: int = 0
+    elapsed: float = 0.0
+    # Seconds until /ping first answered 200, and the timings it reported.
+    ready_after: Optional[float] = None
+    startup: Dict[str, Any] = field(default_factory=dict)
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        stats.latencies.append(seconds)
+        if not ok:
+            stats.errors += 1
+
+    def render(self) -> str:
+        lines = [
+            f"sessions: {self.sessions_done} done, {self.sessions_failed} failed "
+            f"in {self.elapsed:.2f}s",
+        ]
+        if self.ready_after is not None:
+            timings = ", ".join(
+                f"{key} {value:.1f}"
+                for key, value in sorted(self.startup.items())
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            )
+            lines.append(f"ready after {self.ready_after:.2f}s ({timings})")
+        lines += [
+            f"{'endpoint':<24}{'count':>8}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}",
+        ]
+        for name, stats in sorted(self.endpoints.items()):
+            count = len(stats.latencies)
+            rate = count / self.elapsed if self.elapsed else 0.0
+            lines.append(
+                f"{name:<24}{count:>8}{rate:>10.1f}"
+                f"{stats.percentile(50) * 1000:>10.2f}"
+                f"{stats.percentile(95) * 1000:>10.2f}"
+                f"{stats.percentile(99) * 1000:>10.2f}"
+                f"{100 * stats.errors / count if count else 0.0:>8.2f}"
+            )
+        if self.rss_samples:
+            lines.append("server RSS (MiB) over time:")
+            stride = max(1, len(self.rss_samples) // 20)
+            for at, rss in self.rss_samples[::stride]:
+                lines.append(f"  t={at:7.2f}s  {rss / (1024 * 1024):9.1f}")
+        return "\n".join(lines)
+
+
+async def sample_rss(report: LoadReport, pid: int, interval: float, started: float) -> None:
+    while True:
+        rss = process_rss(pid)
+        if rss is not None:
+            report.rss_samples.append((time.perf_counter() - started, rss))
+        await asyncio.sleep(interval)
+
+
+async def wait_ready(client: httpx.AsyncClient, report: LoadReport, timeout: float) -> None:
+    """
+    Poll /ping until the server has finished warming up (200 instead of 503).
+    """
+    started = time.perf_counter()
+    while True:
+        try:
+            response = await client.get("/ping")
+            if response.status_code == 200:
+                report.ready_after = time.perf_counter() - started
+                report.startup = response.json()
+                return
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() - started > timeout:
+            raise RuntimeError(f"server not ready after {timeout:.0f}s")
+        await asyncio.sleep(0.05)
+
+
+# -----------------------------
+# Session simulation
+# -----------------------------
+def random_map(width: int, height: int, density: float, rng: random.Random) -> Dict[str, Any]:
+    """
+    Random map payload whose obstacles still leave a start -> end path.
+    """
+    grid_map = generate_map(width, height)
+    free = [
+        pos for pos, cell in grid_map.cells.items()
+        if cell == CellType.EMPTY
+    ]
+    rng.shuffle(free)
+
+    obstacles: List[List[int]] = []
+    for pos in free[: int(len(free) * density)]:
+        grid_map.cells[pos] = CellType.OBSTACLE
+        if is_reachable(grid_map):
+            obstacles.append([pos[0], pos[1]])
+        else:
+            grid_map.cells[pos] = CellType.EMPTY
+
+    return {
+        "width": width,
+        "height": height,
+        "start": list(grid_map.start),
+        "end": list(grid_map.end),
+        "obstacles": obstacles,
+    }
+
+
+async def timed_post(
+    client: httpx.AsyncClient,
+    report: LoadReport,
+    endpoint: str,
+    payload: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+    except httpx.HTTPError:
+        report.record(endpoint, time.perf_counter() - started, ok=False)
+        return None
+
+    ok = response.status_code < 400
+    report.record(endpoint, time.perf_counter() - started, ok=ok)
+    return response.json() if ok else None
+
+
+async def play_session(
+    client: httpx.AsyncClient,
+    report: LoadReport,
+    map_data: Dict[str, Any],
+    max_turns: int,
+    rng: random.Random,
+) -> bool:
+    state = await timed_post(client, report, "/start-game", map_data)
+    if state is None:
+        return False
+
+    session_id = state["session_id"]
+    last_move: Optional[Dict[str, List[int]]] = None
+
+    for _ in range(max_turns):
+        if state["game_over"]:
+            return True
+
+        candidates = list(map_data["obstacles"])
+        rng.shuffle(candidates)
+        for obstacle in candidates[:4]:
+            hints = await timed_post(client, report, "/legal-obstacle-moves", {
+                "session_id": session_id,
+                "updated_map": map_data,
+                "obstacle": obstacle,
+                "last_move": last_move,
+            })
+            if hints is None:
+                return False
+            if not hints["legal_moves"]:
+                continue
+
+            to_pos = rng.choice(hints["legal_moves"])
+            result = await timed_post(client, report, "/move-obstacle", {
+                "session_id": session_id,
+                "updated_map": map_data,
+                "from_pos": obstacle,
+                "to_pos": to_pos,
+                "last_move": last_move,
+            })
+            if result is None:
+                return False
+
+            map_data = result["updated_map"]
+            last_move = {"from_pos": obstacle, "to_pos": to_pos}
+            break
+
+        state = await timed_post(client, report, "/next-move", {
+            "session_id": session_id,
+            "updated_map": map_data,
+        })
+        if state is None:
+            return False
+
+    return True
+
+
+async def run_load(args: argparse.Namespace) -> LoadReport:
+    report = LoadReport()
+    rng = random.Random(args.seed)
+    maps = [
+        random_map(args.size, args.size, args.density, rng)
+        for _ in range(args.map_variants)
+    ]
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            transport = None
+            base_url = args.url
+            rss_pid = args.server_pid
+        else:
+            from server.server import app
+
+            # ASGITransport does not send lifespan events; run startup and
+            # shutdown (session store, warmup) here as uvicorn would.
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://loadtest"
+            rss_pid = os.getpid()
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        client = await stack.enter_async_context(httpx.AsyncClient(
+            transport=transport,
+            base_url=base_url,
+            limits=limits,
+            timeout=args.timeout,
+        ))
+        await wait_ready(client, report, args.timeout)
+
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def one(index: int) -> None:
+            session_rng = random.Random(args.seed * 1_000_003 + index)
+            async with gate:
+                ok = await play_session(
+                    client,
+                    report,
+                    maps[index % len(maps)],
+                    args.turns,
+                    session_rng,
+                )
+            if ok:
+                report.sessions_done += 1
+            else:
+                report.sessions_failed += 1
+
+        started = time.perf_counter()
+        sampler = None
+        if rss_pid is not None:
+            sampler = asyncio.create_task(
+                sample_rss(report, rss_pid, args.sample_interval, started)
+            )
+        try:
+            await asyncio.gather(*(one(i) for i in range(args.sessions)))
+        finally:
+            report.elapsed = time.perf_counter() - started
+            if sampler is not None:
+                sampler.cancel()
+
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay game sessions against the Pathwatch API.")
+    parser.add_argument("--url", help="base URL of a running server; default runs the ASGI app in-process")
+    parser.add_argument("--server-pid", type=int, help="pid of the server process to sample RSS from (with --url)")
+    parser.add_argument("--sessions", type=int, default=500, help="total sessions to play")
+    parser.add_argument("--concurrency", type=int, default=100, help="sessions in flight at once")
+    parser.add_argument("--turns", type=int, default=20, help="maximum user turns per session")
+    parser.add_argument("--size", type=int, default=80, help="map width and height")
+    parser.add_argument("--density", type=float, default=0.12, help="obstacle fraction of free cells")
+    parser.add_argument("--map-variants", type=int, default=8, help="distinct random maps to rotate through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="RSS sampling interval in seconds")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    print(asyncio.run(run_load(parse_args())).render())
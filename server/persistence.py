@@ -0,0 +1,431 @@
+import logging
+import queue
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+Position = Tuple[int, int]
+
+logger = logging.getLogger(__name__)
+
+# Fold deltas back into the snapshot bitmap after this many per-turn moves.
+COMPACT_EVERY = 64
+
+# Sessions whose last written bitmap the writer keeps in memory. Abandoned
+# games are never ended, so the least recently written ones are dropped and
+# reloaded from the database if they come back.
+CACHED_SESSIONS = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    sx INTEGER NOT NULL,
+    sy INTEGER NOT NULL,
+    ex INTEGER NOT NULL,
+    ey INTEGER NOT NULL,
+    rx INTEGER NOT NULL,
+    ry INTEGER NOT NULL,
+    battery INTEGER NOT NULL,
+    max_battery INTEGER NOT NULL,
+    bitmap BLOB NOT NULL,
+    waypoints BLOB NOT NULL DEFAULT x'',
+    remaining BLOB NOT NULL DEFAULT x'',
+    costs BLOB
+);
+CREATE TABLE IF NOT EXISTS deltas (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    fx INTEGER NOT NULL,
+    fy INTEGER NOT NULL,
+    tx INTEGER NOT NULL,
+    ty INTEGER NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+# -----------------------------
+# Bitmap encoding
+# -----------------------------
+def encode_bitmap(width: int, height: int, obstacles: Iterable[Position]) -> bytearray:
+    """
+    One bit per cell, row-major (bit y * width + x), little-endian bit order.
+    """
+    bitmap = bytearray((width * height + 7) // 8)
+    for x, y in obstacles:
+        index = y * width + x
+        bitmap[index >> 3] |= 1 << (index & 7)
+    return bitmap
+
+
+# Bit offsets set in each byte value, so decoding touches set bits only.
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def decode_bitmap(width: int, bitmap: bytes) -> List[Position]:
+    obstacles: List[Position] = []
+    append = obstacles.append
+    for byte_index, byte in enumerate(bitmap):
+        if not byte:
+            continue
+        base = byte_index << 3
+        for bit in _BYTE_BITS[byte]:
+            index = base + bit
+            append((index % width, index // width))
+    return obstacles
+
+
+def encode_positions(positions: Iterable[Position]) -> bytes:
+    flat = array("i")
+    for x, y in positions:
+        flat.append(x)
+        flat.append(y)
+    return flat.tobytes()
+
+
+def decode_positions(blob: bytes) -> List[Position]:
+    flat = array("i")
+    flat.frombytes(blob)
+    return [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+
+def _flip(bitmap: bytearray, width: int, pos: Position) -> None:
+    index = pos[1] * width + pos[0]
+    bitmap[index >> 3] ^= 1 << (index & 7)
+
+
+def _single_move(width: int, old: bytes, new: bytes) -> Optional[Tuple[Position, Position]]:
+    """
+    (from, to) if new differs from old by exactly one obstacle move.
+    """
+    old_bits = int.from_bytes(old, "little")
+    new_bits = int.from_bytes(new, "little")
+    changed = old_bits ^ new_bits
+    if changed.bit_count() != 2:
+        return None
+
+    removed = changed & old_bits
+    added = changed & new_bits
+    if not removed or not added:
+        return None
+
+    r = removed.bit_length() - 1
+    a = added.bit_length() - 1
+    return (r % width, r // width), (a % width, a // width)
+
+
+# -----------------------------
+# Store
+# -----------------------------
+@dataclass
+class SessionRecord:
+    width: int
+    height: int
+    start: Position
+    end: Position
+    robot_position: Position
+    battery: int
+    max_battery: int
+    obstacles: List[Position]
+    waypoints: List[Position]
+    remaining_waypoints: List[Position]
+    # Terrain cost array (array('B')), None for uniform terrain.
+    costs: Optional[array]
+
+
+@dataclass
+class _Cached:
+    width: int
+    height: int
+    bitmap: bytearray
+    deltas: int
+
+
+class SessionStore:
+    """
+    SQLite-backed, write-behind session persistence.
+
+    Request handlers only enqueue small tuples; a single writer thread encodes
+    maps as bitmaps, diffs them against the last written state and stores
+    either a per-turn delta (one obstacle move) or a fresh snapshot. Deltas
+    are folded into the snapshot every COMPACT_EVERY moves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        for column in ("waypoints", "remaining"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} BLOB NOT NULL DEFAULT x''")
+        if "costs" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN costs BLOB")
+        self._lock = threading.Lock()
+
+        # Writer-side view of what is on disk, so diffs never read back.
+        self._cache: "OrderedDict[str, _Cached]" = OrderedDict()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="session-store", daemon=True)
+        self._writer.start()
+
+    # ---- request path (non-blocking) ----
+    def record_start(
+        self,
+        session_id: str,
+        width: int,
+        height: int,
+        start: Position,
+        end: Position,
+        obstacles: Iterable[Position],
+        waypoints: Iterable[Position],
+        remaining_waypoints: Iterable[Position],
+        costs: Optional[array],
+        robot_position: Position,
+        battery: int,
+        max_battery: int,
+    ) -> None:
+        self._queue.put((
+            "start", session_id, width, height, start, end, obstacles,
+            tuple(waypoints), tuple(remaining_waypoints), costs,
+            robot_position, battery, max_battery,
+        ))
+
+    def record_turn(
+        self,
+        session_id: str,
+        robot_position: Position,
+        battery: int,
+        remaining_waypoints: Iterable[Position] = (),
+        obstacles: Optional[Iterable[Position]] = None,
+    ) -> None:
+        """
+        Robot state after a turn. obstacles is the full map the robot planned
+        on when the server does not track moves itself (HTTP flow).
+        """
+        self._queue.put((
+            "turn", session_id, robot_position, battery,
+            tuple(remaining_waypoints), obstacles,
+        ))
+
+    def record_move(self, session_id: str, from_pos: Position, to_pos: Position) -> None:
+        self._queue.put(("move", session_id, from_pos, to_pos))
+
+    def record_end(self, session_id: str) -> None:
+        self._queue.put(("end", session_id))
+
+    # ---- restore ----
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT width, height, sx, sy, ex, ey, rx, ry, battery, max_battery, "
+                "bitmap, waypoints, remaining, costs FROM sessions WHERE id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            (
+                width, height, sx, sy, ex, ey, rx, ry,
+                battery, max_battery, blob, wps, rem, cost_blob,
+            ) = row
+            bitmap = self._replay(session_id, width, blob)
+
+        return SessionRecord(
+            width=width,
+            height=height,
+            start=(sx, sy),
+            end=(ex, ey),
+            robot_position=(rx, ry),
+            battery=battery,
+            max_battery=max_battery,
+            obstacles=decode_bitmap(width, bitmap),
+            waypoints=decode_positions(wps),
+            remaining_waypoints=decode_positions(rem),
+            costs=array("B", cost_blob) if cost_blob is not None else None,
+        )
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # ---- writer thread ----
+    def _run(self) -> None:
+        while True:
+            op = self._queue.get()
+            batch = [op]
+            # Drain whatever else is queued into the same transaction.
+            while op is not None:
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(op)
+
+            stop = batch[-1] is None
+            ops = [item for item in batch if item is not None]
+            try:
+                if ops:
+                    self._write_batch(ops)
+            except Exception:
+                # Persistence is best effort: a failed batch must not take the
+                # writer (and every later write) down with it.
+                logger.exception("session store batch failed (%d ops)", len(ops))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, ops: List[tuple]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for item in ops:
+                    getattr(self, f"_write_{item[0]}")(*item[1:])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # The writer-side view may now be ahead of disk; rebuild lazily.
+                self._cache.clear()
+                raise
+
+    def _write_snapshot(self, session_id: str, cached: _Cached) -> None:
+        self._conn.execute("UPDATE sessions SET bitmap = ? WHERE id = ?", (bytes(cached.bitmap), session_id))
+        self._conn.execute("DELETE FROM deltas WHERE session_id = ?", (session_id,))
+        cached.deltas = 0
+
+    def _write_delta(self, session_id: str, cached: _Cached, from_pos: Position, to_pos: Position) -> None:
+        _flip(cached.bitmap, cached.width, from_pos)
+        _flip(cached.bitmap, cached.width, to_pos)
+        cached.deltas += 1
+        if cached.deltas >= COMPACT_EVERY:
+            self._write_snapshot(session_id, cached)
+            return
+        self._conn.execute(
+            "INSERT INTO deltas (session_id, seq, fx, fy, tx, ty) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, cached.deltas, from_pos[0], from_pos[1], to_pos[0], to_pos[1]),
+        )
+
+    def _replay(self, session_id: str, width: int, blob: bytes) -> bytearray:
+        bitmap = bytearray(blob)
+        for fx, fy, tx, ty in self._conn.execute(
+            "SELECT fx, fy, tx, ty FROM deltas WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ):
+            _flip(bitmap, width, (fx, fy))
+            _flip(bitmap, width, (tx, ty))
+        return bitmap
+
+    def _remember(self, session_id: str, cached: _Cached) -> None:
+        self._cache[session_id] = cached
+        self._cache.move_to_end(session_id)
+        if len(self._cache) > CACHED_SESSIONS:
+            self._cache.popitem(last=False)
+
+    def _cached(self, session_id: str) -> Optional[_Cached]:
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            self._cache.move_to_end(session_id)
+        else:
+            row = self._conn.execute(
+                "SELECT width, height, bitmap, "
+                "(SELECT COUNT(*) FROM deltas WHERE session_id = ?) "
+                "FROM sessions WHERE id = ?",
+                (session_id, session_id),
+            ).fetchone()
+            if row is None:
+                return None
+            width, height, blob, deltas = row
+            cached = _Cached(
+                width=width,
+                height=height,
+                bitmap=self._replay(session_id, width, blob),
+                deltas=deltas,
+            )
+            self._remember(session_id, cached)
+        return cached
+
+    def _write_start(
+        self,
+        session_id: str,
+        width: int,
+        height: int,
+        start: Position,
+        end: Position,
+        obstacles: Iterable[Position],
+        waypoints: Tuple[Position, ...],
+        remaining_waypoints: Tuple[Position, ...],
+        costs: Optional[array],
+        robot_position: Position,
+        battery: int,
+        max_battery: int,
+    ) -> None:
+        bitmap = encode_bitmap(width, height, obstacles)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions "
+            "(id, width, height, sx, sy, ex, ey, rx, ry, battery, max_battery, "
+            "bitmap, waypoints, remaining, costs) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id, width, height, start[0], start[1], end[0], end[1],
+                robot_position[0], robot_position[1], battery, max_battery, bytes(bitmap),
+                encode_positions(waypoints), encode_positions(remaining_waypoints),
+                costs.tobytes() if costs is not None else None,
+            ),
+        )
+        self._conn.execute("DELETE FROM deltas WHERE session_id = ?", (session_id,))
+        self._remember(session_id, _Cached(width=width, height=height, bitmap=bitmap, deltas=0))
+
+    def _write_turn(
+        self,
+        session_id: str,
+        robot_position: Position,
+        battery: int,
+        remaining_waypoints: Tuple[Position, ...],
+        obstacles: Optional[Iterable[Position]],
+    ) -> None:
+        self._conn.execute(
+            "UPDATE sessions SET rx = ?, ry = ?, battery = ?, remaining = ? WHERE id = ?",
+            (
+                robot_position[0], robot_position[1], battery,
+                encode_positions(remaining_waypoints), session_id,
+            ),
+        )
+        if obstacles is None:
+            return
+
+        cached = self._cached(session_id)
+        if cached is None:
+            return
+        new_bitmap = encode_bitmap(cached.width, cached.height, obstacles)
+        if new_bitmap == cached.bitmap:
+            return
+
+        move = _single_move(cached.width, cached.bitmap, new_bitmap)
+        if move is not None:
+            self._write_delta(session_id, cached, *move)
+        else:
+            cached.bitmap = new_bitmap
+            self._write_snapshot(session_id, cached)
+
+    def _write_move(self, session_id: str, from_pos: Position, to_pos: Position) -> None:
+        cached = self._cached(session_id)
+        if cached is not None:
+            self._write_delta(session_id, cached, from_pos, to_pos)
+
+    def _write_end(self, session_id: str) -> None:
+        self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._conn.execute("DELETE FROM deltas WHERE session_id = ?", (session_id,))
+        self._cache.pop(session_id, None)
@@ -0,0 +1,102 @@
+from typing import Any
+
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _encode_default(obj: Any) -> Any:
+    """
+    Fallback for objects the encoders do not know natively.
+
+    Response models are built with ``model_construct`` from data the server
+    produced itself, so they are dumped straight from their field values
+    instead of going through pydantic validation/serialization again.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def encode_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_encode_default)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_encode_default, use_bin_type=True)
+
+
+def decode_json(data: Any) -> Any:
+    return orjson.loads(data)
+
+
+def decode_msgpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+class FastJSONResponse(Response):
+    """
+    orjson-backed JSON response, used as the app-wide default.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPES[0]
+
+    def render(self, content: Any) -> bytes:
+        return encode_msgpack(content)
+
+
+def wants_msgpack(accept: str) -> bool:
+    """
+    True if the Accept header ranks msgpack at least as high as JSON.
+    """
+    if not accept:
+        return False
+
+    msgpack_q = 0.0
+    json_q = 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            json_q = max(json_q, q)
+
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def negotiate(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Encode content as msgpack or JSON depending on the client's Accept header.
+
+    Returning a Response directly also tells FastAPI to skip response_model
+    validation, which the endpoints only declare for the OpenAPI schema.
+    """
+    if wants_msgpack(request.headers.get("accept", "")):
+        response: Response = MsgpackResponse(content, status_code=status_code)
+    else:
+        response = FastJSONResponse(content, status_code=status_code)
+    response.headers["Vary"] = "Accept"
+    return response
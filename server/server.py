@@ -1,15 +1,97 @@
-from collections import deque
-from typing import Dict, List, Optional, Set, Tuple, TypedDict
+import time
+
+# Measured from here so /ping can report how long importing the app took
+# (framework, engine and server modules) on a cold worker.
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from pydantic import BaseModel
 
-from engine.Map_gen import CellType, GridMap
+from engine import memory
+from engine.Map_gen import CellType, GridMap, make_costs
+from engine.missions import Mission
+from engine.reachability import route_exists
 from engine.robot import Robot
+from engine.warmup import WARM_SIZES, warm_up
+from server.persistence import SessionRecord, SessionStore
+from server.responses import (
+    FastJSONResponse,
+    decode_json,
+    decode_msgpack,
+    encode_json,
+    encode_msgpack,
+    negotiate,
+)
+
+logger = logging.getLogger(__name__)
+
+# Set PATHWATCH_SESSION_DB to an empty string to keep sessions in memory only.
+SESSION_DB_PATH = os.environ.get("PATHWATCH_SESSION_DB", "sessions.db")
+session_store: Optional[SessionStore] = None
+
+# Set PATHWATCH_WARMUP=0 to report healthy without a warmup pass.
+WARMUP_ENABLED = os.environ.get("PATHWATCH_WARMUP", "1") != "0"
+
+# Cold-start figures reported by /ping. `ready` flips once warmup is done;
+# until then /ping answers 503 so the platform keeps traffic away.
+startup: Dict[str, Any] = {"ready": False, "import_ms": None, "warmup_ms": None}
+
+
+async def _run_warmup() -> None:
+    started = time.perf_counter()
+    try:
+        timings = await run_in_threadpool(_warm_up_server)
+    except Exception:
+        logger.exception("warmup failed; serving cold")
+        timings = {}
+    startup.update(timings)
+    startup["warmup_ms"] = (time.perf_counter() - started) * 1000
+    startup["ready"] = True
+    logger.info(
+        "ready: import %.1f ms, warmup %.1f ms",
+        startup["import_ms"] or 0.0,
+        startup["warmup_ms"],
+    )
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    global session_store
+    if SESSION_DB_PATH:
+        session_store = SessionStore(SESSION_DB_PATH)
 
-app = FastAPI()
+    warmup: Optional[asyncio.Task] = None
+    if WARMUP_ENABLED:
+        warmup = asyncio.create_task(_run_warmup())
+    else:
+        startup["ready"] = True
+    try:
+        yield
+    finally:
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+        if session_store is not None:
+            # Drains the write-behind queue before the process exits.
+            session_store.close()
+            session_store = None
+
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +111,9 @@ class MapData(BaseModel):
     start: List[int]
     end: List[int]
     obstacles: List[List[int]]
+    waypoints: List[List[int]] = []
+    # Sparse terrain: [x, y, cost] for cells whose entry cost is not 1.
+    terrain: List[List[int]] = []
 
 
 class LastMoveData(BaseModel):
@@ -39,6 +124,9 @@ class LastMoveData(BaseModel):
 class NextMoveRequest(BaseModel):
     session_id: str
     updated_map: MapData
+    # Planning deadline for this turn. When set the robot plans with anytime
+    # ARA* and the response reports the suboptimality bound it reached.
+    time_budget_ms: Optional[float] = None
 
 
 class LegalObstacleMovesRequest(BaseModel):
@@ -56,6 +144,32 @@ class MoveObstacleRequest(BaseModel):
     last_move: Optional[LastMoveData] = None
 
 
+# Response models document the API schema only. Endpoints build them with
+# model_construct (no validation) and hand them to negotiate(), so FastAPI
+# never re-validates data the server produced itself.
+class GameStateResponse(BaseModel):
+    session_id: str
+    robot_position: List[int]
+    battery: int
+    max_battery: int
+    moved: bool
+    reached_end: bool
+    game_over: bool
+    winner: Optional[str] = None
+    remaining_waypoints: List[List[int]] = []
+    # cost(path) <= bound * optimal for this turn's plan; only reported for
+    # time-budgeted turns, and null if the budget ran out before a full path.
+    suboptimality_bound: Optional[float] = None
+
+
+class LegalMovesResponse(BaseModel):
+    legal_moves: List[List[int]]
+
+
+class MoveObstacleResponse(BaseModel):
+    updated_map: MapData
+
+
 class SessionState(TypedDict):
     robot: Robot
     max_battery: int
@@ -64,9 +178,119 @@ class SessionState(TypedDict):
 sessions: Dict[str, SessionState] = {}
 
 
+@lru_cache(maxsize=8)
+def _empty_template(width: int, height: int) -> Dict[Position, CellType]:
+    # Shared and never mutated; use _empty_cells for a map's own copy. The
+    # cache holds a few sizes: clients use a handful of map sizes.
+    return {(x, y): CellType.EMPTY for x in range(width) for y in range(height)}
+
+
+def _empty_cells(width: int, height: int) -> Dict[Position, CellType]:
+    """
+    All-EMPTY cell dict, copied from a cached template (one C-level copy
+    instead of W*H tuple inserts).
+    """
+    return _empty_template(width, height).copy()
+
+
+def _restore_session(record: SessionRecord) -> SessionState:
+    cells = _empty_cells(record.width, record.height)
+    cells[record.start] = CellType.START
+    cells[record.end] = CellType.END
+    for pos in record.obstacles:
+        cells[pos] = CellType.OBSTACLE
+
+    grid_map = GridMap(
+        width=record.width,
+        height=record.height,
+        cells=cells,
+        start=record.start,
+        end=record.end,
+        waypoints=record.waypoints,
+        costs=record.costs,
+    )
+    robot = Robot(grid_map, planner=_planner_for(grid_map))
+    robot.position = record.robot_position
+    robot.battery = record.battery
+    if robot.mission is not None:
+        robot.mission.remaining = list(record.remaining_waypoints)
+    return {"robot": robot, "max_battery": record.max_battery}
+
+
+def _get_session(session_id: str) -> Optional[SessionState]:
+    """
+    In-memory session, lazily restored from the session store after a restart.
+    """
+    session = sessions.get(session_id)
+    if session is not None or session_store is None:
+        return session
+
+    record = session_store.load(session_id)
+    if record is None:
+        return None
+    return sessions.setdefault(session_id, _restore_session(record))
+
+
+def _persist_start(
+    session_id: str,
+    robot: Robot,
+    max_battery: int,
+    obstacles: List[List[int]],
+) -> None:
+    """
+    Full session record: used for new games and whenever the session map
+    was rebuilt, since turn records only carry robot state and obstacles.
+    """
+    if session_store is None:
+        return
+    grid_map = robot.grid_map
+    session_store.record_start(
+        session_id,
+        grid_map.width,
+        grid_map.height,
+        grid_map.start,
+        grid_map.end,
+        obstacles,
+        grid_map.waypoints,
+        robot.mission.remaining if robot.mission is not None else (),
+        grid_map.costs,
+        robot.position,
+        robot.battery,
+        max_battery,
+    )
+
+
+def _persist_turn(
+    session_id: str,
+    robot: Robot,
+    game_over: bool,
+    obstacles: Optional[List[List[int]]] = None,
+) -> None:
+    if session_store is None:
+        return
+    if game_over:
+        session_store.record_end(session_id)
+    else:
+        remaining = robot.mission.remaining if robot.mission is not None else []
+        session_store.record_turn(
+            session_id,
+            robot.position,
+            robot.battery,
+            remaining,
+            obstacles,
+        )
+
+
+# Debug endpoints are only mounted when PATHWATCH_DEBUG=1.
+DEBUG_ENDPOINTS = os.environ.get("PATHWATCH_DEBUG", "") == "1"
+
+
 @app.get("/ping")
-def ping():
-    return {"status": "alive"}
+def ping(request: Request) -> Response:
+    timings = {key: value for key, value in startup.items() if key != "ready"}
+    if not startup["ready"]:
+        return negotiate(request, {"status": "warming", **timings}, status_code=503)
+    return negotiate(request, {"status": "alive", **timings})
 
 
 def _to_pos(raw: List[int], label: str) -> Position:
@@ -80,6 +304,10 @@ def _in_bounds(pos: Position, width: int, height: int) -> bool:
     return 0 <= x < width and 0 <= y < height
 
 
+MAX_TERRAIN_COST = 255
+MAX_TIME_BUDGET_MS = 10_000
+
+
 def _validate_map_data(map_data: MapData) -> None:
     if map_data.width <= 0 or map_data.height <= 0:
         raise HTTPException(status_code=400, detail="width and height must be positive")
@@ -105,14 +333,36 @@ def _validate_map_data(map_data: MapData) -> None:
             raise HTTPException(status_code=400, detail=f"duplicate obstacle: {list(pos)}")
         seen.add(pos)
 
+    waypoints: Set[Position] = set()
+    for raw in map_data.waypoints:
+        pos = _to_pos(raw, "waypoint")
+        if not _in_bounds(pos, map_data.width, map_data.height):
+            raise HTTPException(status_code=400, detail=f"waypoint out of bounds: {list(pos)}")
+        if pos == start or pos == end:
+            raise HTTPException(status_code=400, detail=f"waypoint cannot be on start/end: {list(pos)}")
+        if pos in seen:
+            raise HTTPException(status_code=400, detail=f"waypoint cannot be on an obstacle: {list(pos)}")
+        if pos in waypoints:
+            raise HTTPException(status_code=400, detail=f"duplicate waypoint: {list(pos)}")
+        waypoints.add(pos)
+
+    for raw in map_data.terrain:
+        if len(raw) != 3:
+            raise HTTPException(status_code=400, detail="terrain entries must be [x, y, cost]")
+        pos = (raw[0], raw[1])
+        if not _in_bounds(pos, map_data.width, map_data.height):
+            raise HTTPException(status_code=400, detail=f"terrain out of bounds: {list(pos)}")
+        if not 1 <= raw[2] <= MAX_TERRAIN_COST:
+            raise HTTPException(
+                status_code=400,
+                detail=f"terrain cost must be 1..{MAX_TERRAIN_COST}: {raw}",
+            )
+
 
 def build_gridmap(map_data: MapData) -> GridMap:
     _validate_map_data(map_data)
 
-    cells = {}
-    for x in range(map_data.width):
-        for y in range(map_data.height):
-            cells[(x, y)] = CellType.EMPTY
+    cells = _empty_cells(map_data.width, map_data.height)
 
     start = _to_pos(map_data.start, "start")
     end = _to_pos(map_data.end, "end")
@@ -123,72 +373,124 @@ def build_gridmap(map_data: MapData) -> GridMap:
     for obs in map_data.obstacles:
         cells[_to_pos(obs, "obstacle")] = CellType.OBSTACLE
 
-    return GridMap(
+    grid_map = GridMap(
         width=map_data.width,
         height=map_data.height,
         cells=cells,
         start=start,
         end=end,
+        waypoints=[_to_pos(raw, "waypoint") for raw in map_data.waypoints],
+        costs=make_costs(
+            map_data.width,
+            map_data.height,
+            {(raw[0], raw[1]): raw[2] for raw in map_data.terrain},
+        ),
     )
+    if not route_exists(grid_map):
+        raise HTTPException(status_code=400, detail="end or a waypoint is unreachable from start")
+    return grid_map
 
 
-def _path_exists(grid_map: GridMap) -> bool:
-    queue = deque([grid_map.start])
-    visited = {grid_map.start}
+def _sync_session_map(current: GridMap, map_data: MapData) -> GridMap:
+    """
+    The session map updated to match the client's copy.
 
-    while queue:
-        x, y = queue.popleft()
-        if (x, y) == grid_map.end:
-            return True
+    When only obstacles differ they are applied to the existing map with
+    set_cell, so derived structures (mission distance fields, ...) are
+    repaired in place. Any other difference rebuilds the map.
+    """
+    _validate_map_data(map_data)
+    start = _to_pos(map_data.start, "start")
+    end = _to_pos(map_data.end, "end")
+    waypoints = [_to_pos(raw, "waypoint") for raw in map_data.waypoints]
+    costs = make_costs(
+        map_data.width,
+        map_data.height,
+        {(raw[0], raw[1]): raw[2] for raw in map_data.terrain},
+    )
+    same_layout = (
+        (current.width, current.height) == (map_data.width, map_data.height)
+        and current.start == start
+        and current.end == end
+        and current.waypoints == waypoints
+        and current.costs == costs
+    )
+    if not same_layout:
+        return build_gridmap(map_data)
+
+    incoming = {_to_pos(obs, "obstacle") for obs in map_data.obstacles}
+    existing = _obstacle_set(current)
+    for pos in existing - incoming:
+        current.set_cell(pos, CellType.EMPTY)
+    for pos in incoming - existing:
+        current.set_cell(pos, CellType.OBSTACLE)
+    return current
+
+
+def _sync_mission(robot: Robot, waypoints: List[Position]) -> None:
+    """
+    Rebuild the robot's mission when the client sent a different waypoint
+    list. Waypoints the robot already visited stay visited.
+    """
+    mission = robot.mission
+    current = mission.waypoints if mission is not None else []
+    if list(dict.fromkeys(waypoints)) == current:
+        return
+    visited = set(current) - set(mission.remaining) if mission is not None else set()
+    robot.mission = Mission(waypoints) if waypoints else None
+    if robot.mission is not None:
+        robot.mission.remaining = [pos for pos in robot.mission.remaining if pos not in visited]
+
+
+def _planner_for(grid_map: GridMap) -> str:
+    # BFS is optimal on uniform terrain; weighted maps need the bucket A*.
+    return "bfs" if grid_map.costs is None else "astar"
 
-        for nx, ny in [
-            (x + 1, y),
-            (x - 1, y),
-            (x, y + 1),
-            (x, y - 1),
-        ]:
-            if not grid_map.in_bounds(nx, ny):
-                continue
-            if (nx, ny) in visited:
-                continue
-            if grid_map.cells[(nx, ny)] == CellType.OBSTACLE:
-                continue
 
-            visited.add((nx, ny))
-            queue.append((nx, ny))
+MoveTuple = Tuple[Position, Position]
 
-    return False
+
+def _last_move_positions(last_move: Optional[LastMoveData]) -> Optional[MoveTuple]:
+    if last_move is None:
+        return None
+    return (
+        _to_pos(last_move.from_pos, "last_move.from_pos"),
+        _to_pos(last_move.to_pos, "last_move.to_pos"),
+    )
 
 
 def _is_immediate_reverse(
     from_pos: Position,
     to_pos: Position,
-    last_move: Optional[LastMoveData],
+    last_move: Optional[MoveTuple],
 ) -> bool:
     if last_move is None:
         return False
 
-    return (
-        from_pos == _to_pos(last_move.to_pos, "last_move.to_pos")
-        and to_pos == _to_pos(last_move.from_pos, "last_move.from_pos")
-    )
+    return from_pos == last_move[1] and to_pos == last_move[0]
 
 
-def _compute_legal_obstacle_moves(
-    map_data: MapData,
+def _obstacle_set(grid_map: GridMap) -> Set[Position]:
+    return {pos for pos, cell in grid_map.cells.items() if cell == CellType.OBSTACLE}
+
+
+def _legal_moves_on_grid(
+    grid_map: GridMap,
+    obstacles: Set[Position],
     obstacle_pos: Position,
     robot_pos: Position,
-    last_move: Optional[LastMoveData],
+    last_move: Optional[MoveTuple],
 ) -> List[List[int]]:
-    _validate_map_data(map_data)
+    """
+    Legal moves for one obstacle, checked against grid_map.
 
-    obstacles = {_to_pos(obs, "obstacle") for obs in map_data.obstacles}
+    Candidates are tried on a copy-on-write snapshot, so grid_map itself is
+    never modified and may be the live session map.
+    """
     if obstacle_pos not in obstacles:
         return []
 
-    start = _to_pos(map_data.start, "start")
-    end = _to_pos(map_data.end, "end")
-
+    view = grid_map.snapshot()
     x, y = obstacle_pos
     neighbors = [
         (x + 1, y),
@@ -199,97 +501,139 @@ def _compute_legal_obstacle_moves(
 
     legal_moves: List[List[int]] = []
 
-    for to_pos in neighbors:
-        nx, ny = to_pos
-
-        if not _in_bounds(to_pos, map_data.width, map_data.height):
-            continue
-        if to_pos == start or to_pos == end or to_pos == robot_pos:
-            continue
-        if to_pos in obstacles:
-            continue
-        if _is_immediate_reverse(obstacle_pos, to_pos, last_move):
-            continue
-
-        candidate_obstacles = set(obstacles)
-        candidate_obstacles.remove(obstacle_pos)
-        candidate_obstacles.add(to_pos)
-
-        candidate_map = MapData(
-            width=map_data.width,
-            height=map_data.height,
-            start=map_data.start,
-            end=map_data.end,
-            obstacles=[list(pos) for pos in candidate_obstacles],
-        )
+    try:
+        for to_pos in neighbors:
+            nx, ny = to_pos
+
+            if not grid_map.in_bounds(nx, ny):
+                continue
+            if to_pos == grid_map.start or to_pos == grid_map.end or to_pos == robot_pos:
+                continue
+            if to_pos in grid_map.waypoints:
+                continue
+            if to_pos in obstacles:
+                continue
+            if _is_immediate_reverse(obstacle_pos, to_pos, last_move):
+                continue
+
+            view.set_cell(obstacle_pos, CellType.EMPTY)
+            view.set_cell(to_pos, CellType.OBSTACLE)
+            reachable = route_exists(view)
+            view.set_cell(to_pos, CellType.EMPTY)
+            view.set_cell(obstacle_pos, CellType.OBSTACLE)
 
-        if _path_exists(build_gridmap(candidate_map)):
-            legal_moves.append([nx, ny])
+            if reachable:
+                legal_moves.append([nx, ny])
+    finally:
+        view.release()
 
     return legal_moves
 
 
-@app.post("/start-game")
-def start_game(map_data: MapData):
+def _compute_legal_obstacle_moves(
+    map_data: MapData,
+    obstacle_pos: Position,
+    robot_pos: Position,
+    last_move: Optional[LastMoveData],
+) -> List[List[int]]:
     grid_map = build_gridmap(map_data)
-    robot = Robot(grid_map)
-    robot.battery = 21
-    max_battery = 21
-    moved = robot.move()
+    obstacles = {_to_pos(obs, "obstacle") for obs in map_data.obstacles}
 
-    session_id = str(uuid4())
+    return _legal_moves_on_grid(
+        grid_map,
+        obstacles,
+        obstacle_pos,
+        robot_pos,
+        _last_move_positions(last_move),
+    )
+
+
+def _outcome(robot: Robot, moved: bool) -> Tuple[bool, bool, Optional[str]]:
     reached_end = robot.reached_end()
     game_over = reached_end or (not moved)
     winner = "robot" if reached_end else ("user" if game_over else None)
+    return reached_end, game_over, winner
+
+
+def _game_state(
+    session_id: str,
+    robot: Robot,
+    max_battery: int,
+    moved: bool,
+) -> GameStateResponse:
+    reached_end, game_over, winner = _outcome(robot, moved)
+    bound = robot.last_bound
+    if bound is not None and math.isinf(bound):
+        bound = None
+
+    return GameStateResponse.model_construct(
+        session_id=session_id,
+        robot_position=robot.position,
+        battery=robot.battery,
+        max_battery=max_battery,
+        moved=moved,
+        reached_end=reached_end,
+        game_over=game_over,
+        winner=winner,
+        remaining_waypoints=robot.mission.remaining if robot.mission is not None else [],
+        suboptimality_bound=bound,
+    )
+
 
+@app.post("/start-game", response_model=GameStateResponse)
+def start_game(map_data: MapData, request: Request) -> Response:
+    grid_map = build_gridmap(map_data)
+    robot = Robot(grid_map, planner=_planner_for(grid_map))
+    robot.battery = 21
+    max_battery = 21
+    moved = robot.move()
+
+    session_id = str(uuid4())
     sessions[session_id] = {
         "robot": robot,
         "max_battery": max_battery,
     }
 
-    return {
-        "session_id": session_id,
-        "robot_position": robot.position,
-        "battery": robot.battery,
-        "max_battery": max_battery,
-        "moved": moved,
-        "reached_end": reached_end,
-        "game_over": game_over,
-        "winner": winner,
-    }
+    state = _game_state(session_id, robot, max_battery, moved)
+    if not state.game_over:
+        _persist_start(session_id, robot, max_battery, map_data.obstacles)
+    return negotiate(request, state)
 
 
-@app.post("/next-move")
-def next_move(payload: NextMoveRequest):
-    session = sessions.get(payload.session_id)
+@app.post("/next-move", response_model=GameStateResponse)
+def next_move(payload: NextMoveRequest, request: Request) -> Response:
+    session = _get_session(payload.session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    budget = payload.time_budget_ms
+    if budget is not None and not 0 < budget <= MAX_TIME_BUDGET_MS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"time_budget_ms must be in (0, {MAX_TIME_BUDGET_MS}]",
+        )
+
     robot = session["robot"]
-    updated_grid = build_gridmap(payload.updated_map)
+    updated_grid = _sync_session_map(robot.grid_map, payload.updated_map)
+    rebuilt = updated_grid is not robot.grid_map
     robot.grid_map = updated_grid
+    _sync_mission(robot, updated_grid.waypoints)
+    robot.planner = _planner_for(updated_grid)
+    robot.time_budget = None if budget is None else budget / 1000
     robot.end = updated_grid.end
 
     moved = robot.move()
-    reached_end = robot.reached_end()
-    game_over = reached_end or (not moved)
-    winner = "robot" if reached_end else ("user" if game_over else None)
+    state = _game_state(payload.session_id, robot, session["max_battery"], moved)
+    if rebuilt and not state.game_over:
+        _persist_start(payload.session_id, robot, session["max_battery"], payload.updated_map.obstacles)
+    else:
+        _persist_turn(payload.session_id, robot, state.game_over, payload.updated_map.obstacles)
+    return negotiate(request, state)
 
-    return {
-        "session_id": payload.session_id,
-        "robot_position": robot.position,
-        "battery": robot.battery,
-        "max_battery": session["max_battery"],
-        "moved": moved,
-        "reached_end": reached_end,
-        "game_over": game_over,
-        "winner": winner,
-    }
 
-
-@app.post("/legal-obstacle-moves")
-def legal_obstacle_moves(payload: LegalObstacleMovesRequest):
-    session = sessions.get(payload.session_id)
+@app.post("/legal-obstacle-moves", response_model=LegalMovesResponse)
+def legal_obstacle_moves(payload: LegalObstacleMovesRequest, request: Request) -> Response:
+    session = _get_session(payload.session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -301,12 +645,12 @@ def legal_obstacle_moves(payload: LegalObstacleMovesRequest):
         last_move=payload.last_move,
     )
 
-    return {"legal_moves": legal_moves}
+    return negotiate(request, LegalMovesResponse.model_construct(legal_moves=legal_moves))
 
 
-@app.post("/move-obstacle")
-def move_obstacle(payload: MoveObstacleRequest):
-    session = sessions.get(payload.session_id)
+@app.post("/move-obstacle", response_model=MoveObstacleResponse)
+def move_obstacle(payload: MoveObstacleRequest, request: Request) -> Response:
+    session = _get_session(payload.session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -324,19 +668,401 @@ def move_obstacle(payload: MoveObstacleRequest):
     if [to_pos[0], to_pos[1]] not in legal_moves:
         raise HTTPException(status_code=400, detail="Illegal obstacle move")
 
-    next_obstacles: List[List[int]] = []
-    for obs in payload.updated_map.obstacles:
-        pos = _to_pos(obs, "obstacle")
-        if pos != from_pos:
-            next_obstacles.append([pos[0], pos[1]])
+    # Obstacles were validated above, so the incoming lists are reused as-is.
+    next_obstacles: List[List[int]] = [
+        obs for obs in payload.updated_map.obstacles
+        if obs[0] != from_pos[0] or obs[1] != from_pos[1]
+    ]
     next_obstacles.append([to_pos[0], to_pos[1]])
 
+    updated_map = MapData.model_construct(
+        width=payload.updated_map.width,
+        height=payload.updated_map.height,
+        start=payload.updated_map.start,
+        end=payload.updated_map.end,
+        obstacles=next_obstacles,
+        waypoints=payload.updated_map.waypoints,
+        terrain=payload.updated_map.terrain,
+    )
+    return negotiate(request, MoveObstacleResponse.model_construct(updated_map=updated_map))
+
+
+# -----------------------------
+# Memory instrumentation
+# -----------------------------
+# Mounted only when DEBUG_ENDPOINTS is set, and never listed in the schema.
+debug_router = APIRouter(prefix="/debug", include_in_schema=False)
+
+
+def _session_footprint(sample: int) -> Dict[str, Any]:
+    """
+    Deep-size estimate over a random sample of sessions, extrapolated to all.
+    """
+    ids = list(sessions.keys())
+    if len(ids) > sample:
+        ids = random.sample(ids, sample)
+
+    sizes = []
+    for session_id in ids:
+        session = sessions.get(session_id)
+        if session is not None:
+            sizes.append(memory.deep_sizeof(session))
+
+    mean = sum(sizes) / len(sizes) if sizes else 0.0
     return {
-        "updated_map": {
-            "width": payload.updated_map.width,
-            "height": payload.updated_map.height,
-            "start": payload.updated_map.start,
-            "end": payload.updated_map.end,
-            "obstacles": next_obstacles,
-        }
+        "count": len(sessions),
+        "sampled": len(sizes),
+        "mean_bytes": int(mean),
+        "max_bytes": max(sizes, default=0),
+        "estimated_total_bytes": int(mean * len(sessions)),
     }
+
+
+@debug_router.get("/memory")
+def debug_memory(request: Request, sessions_sample: int = 50, top: int = 20) -> Response:
+    snapshot = memory.take_snapshot()
+    hotspots = memory.allocation_hotspots(snapshot, top) if snapshot is not None else []
+
+    return negotiate(request, {
+        "rss_bytes": memory.process_rss(),
+        "tracing": snapshot is not None,
+        "hotspots": hotspots,
+        "sessions": _session_footprint(max(1, sessions_sample)),
+        "planners": {
+            name: {
+                "calls": stats.calls,
+                "sampled": stats.sampled,
+                "peak_max_bytes": stats.peak_max,
+                "peak_mean_bytes": int(stats.peak_mean),
+            }
+            for name, stats in memory.PLANNER_MEMORY.items()
+        },
+    })
+
+
+@debug_router.get("/memory/{session_id}")
+def debug_session_memory(session_id: str, request: Request) -> Response:
+    session = _get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    robot = session["robot"]
+    return negotiate(request, {
+        "session_id": session_id,
+        "total_bytes": memory.deep_sizeof(session),
+        "grid_map_bytes": memory.deep_sizeof(robot.grid_map),
+    })
+
+
+@debug_router.post("/memory/tracing")
+def debug_memory_tracing(
+    request: Request,
+    enabled: bool = True,
+    frames: int = 1,
+    planner_sample_every: Optional[int] = None,
+) -> Response:
+    if enabled:
+        memory.start_tracing(max(1, frames))
+    else:
+        memory.stop_tracing()
+    if planner_sample_every is not None:
+        memory.set_planner_sampling(planner_sample_every)
+
+    return negotiate(request, {"tracing": enabled})
+
+
+if DEBUG_ENDPOINTS:
+    app.include_router(debug_router)
+
+
+# -----------------------------
+# Startup warmup
+# -----------------------------
+def _warm_up_server() -> Dict[str, float]:
+    """
+    Engine warmup plus one request's worth of server-side work (validation,
+    map build, legal-move check, response encoding) on a sample map.
+    """
+    timings = warm_up()
+
+    started = time.perf_counter()
+    width, height = WARM_SIZES[-1] if WARM_SIZES else (20, 20)
+    wall_x = width // 2
+    map_data = MapData(
+        width=width,
+        height=height,
+        start=[0, 0],
+        end=[width - 1, height - 1],
+        obstacles=[[wall_x, y] for y in range(height - 1)],
+    )
+    grid_map = build_gridmap(map_data)
+    _legal_moves_on_grid(grid_map, _obstacle_set(grid_map), (wall_x, 0), grid_map.start, None)
+    robot = Robot(grid_map, planner=_planner_for(grid_map))
+    moved = robot.move()
+    state = _game_state("warmup", robot, robot.battery, moved)
+    encode_json(state)
+    encode_msgpack(state)
+    timings["server_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+# -----------------------------
+# WebSocket game channel
+# -----------------------------
+# One socket per game. The server keeps the authoritative map (the robot's
+# grid) so frames only carry moves and state, never the whole map.
+#
+# client -> server
+#   {"t": "sel", "o": [x, y]}                 ask for legal moves of an obstacle
+#   {"t": "mv", "f": [x, y], "to": [x, y]}    move an obstacle (user turn)
+# server -> client
+#   {"t": "state", "pos": [x, y], "bat": n, "max": n, "moved": bool, "wp": [[x, y], ...]}
+#   {"t": "hints", "o": [x, y], "moves": [[x, y], ...]}
+#   {"t": "over", "winner": "robot" | "user", "reached_end": bool}
+#   {"t": "err", "detail": str}
+#
+# Binary frames are msgpack, text frames are JSON; replies use the encoding
+# of the last frame the client sent.
+
+
+class _Speculation:
+    """
+    Robot replies to the candidate moves of one selected obstacle, planned
+    in a worker thread while the user is still choosing. Each candidate has
+    its own future, so a move can use its reply as soon as it is ready.
+    """
+
+    def __init__(self, from_pos: Position, moves: List[List[int]]):
+        self.from_pos = from_pos
+        self.replies: Dict[MoveTuple, "Future[Optional[Position]]"] = {
+            (from_pos, (nx, ny)): Future() for nx, ny in moves
+        }
+        self.stopped = threading.Event()
+        self.worker: Optional[asyncio.Future] = None
+
+    def reply(self, move: MoveTuple) -> Optional["Future[Optional[Position]]"]:
+        """
+        The reply to move if it was planned successfully, else None.
+        """
+        future = self.replies.get(move)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future
+
+    def start(self, robot: Robot, grid_map: GridMap) -> None:
+        self.worker = asyncio.ensure_future(run_in_threadpool(self._run, robot, grid_map))
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    async def join(self) -> None:
+        """
+        Stop planning and wait for the worker to leave the map alone.
+        """
+        self.stop()
+        if self.worker is None:
+            return
+        try:
+            await self.worker
+        except Exception:
+            logger.exception("speculation worker failed")
+
+    def _run(self, robot: Robot, grid_map: GridMap) -> None:
+        # Edits go through set_cell so mission distance fields on the
+        # snapshot are repaired, not rebuilt.
+        from_pos = self.from_pos
+        scratch = grid_map.snapshot()
+        try:
+            for (_, to_pos), future in self.replies.items():
+                if self.stopped.is_set():
+                    return
+                try:
+                    scratch.set_cell(from_pos, CellType.EMPTY)
+                    scratch.set_cell(to_pos, CellType.OBSTACLE)
+                    future.set_result(robot.plan_step(scratch))
+                    scratch.set_cell(to_pos, CellType.EMPTY)
+                    scratch.set_cell(from_pos, CellType.OBSTACLE)
+                except Exception as exc:
+                    # Only a shortcut: on_move plans these moves directly.
+                    logger.exception("speculation failed for move to %s", to_pos)
+                    future.set_exception(exc)
+                    return
+        finally:
+            scratch.release()
+
+
+class _GameChannel:
+    def __init__(self, websocket: WebSocket, session_id: str, session: SessionState):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.session = session
+        self.robot = session["robot"]
+        self.obstacles = _obstacle_set(self.robot.grid_map)
+        self.last_move: Optional[MoveTuple] = None
+        self.binary = False
+        self.speculation: Optional[_Speculation] = None
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if self.binary:
+            await self.websocket.send_bytes(encode_msgpack(message))
+        else:
+            await self.websocket.send_text(encode_json(message).decode())
+
+    async def receive(self) -> Optional[Dict[str, Any]]:
+        frame = await self.websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            return None
+
+        data = frame.get("bytes")
+        self.binary = data is not None
+        try:
+            if self.binary:
+                return decode_msgpack(data)
+            return decode_json(frame.get("text") or "")
+        except ValueError:
+            return {}
+
+    async def push_state(self, moved: bool) -> bool:
+        """
+        Send the robot state; returns True if the game is over.
+        """
+        robot = self.robot
+        await self.send({
+            "t": "state",
+            "pos": robot.position,
+            "bat": robot.battery,
+            "max": self.session["max_battery"],
+            "moved": moved,
+            "wp": robot.mission.remaining if robot.mission is not None else [],
+        })
+
+        reached_end, game_over, winner = _outcome(robot, moved)
+        if game_over:
+            await self.send({"t": "over", "winner": winner, "reached_end": reached_end})
+        return game_over
+
+    def cancel_speculation(self) -> None:
+        if self.speculation is not None:
+            self.speculation.stop()
+            self.speculation = None
+
+    async def end_speculation(self) -> Optional[_Speculation]:
+        """
+        Stop the running speculation and wait until its worker is done with
+        the map, so the map can be edited; returns it for its replies.
+        """
+        speculation = self.speculation
+        self.speculation = None
+        if speculation is not None:
+            await speculation.join()
+        return speculation
+
+    async def on_select(self, obstacle_pos: Position) -> None:
+        await self.end_speculation()
+
+        robot = self.robot
+        moves = await run_in_threadpool(
+            _legal_moves_on_grid,
+            robot.grid_map,
+            self.obstacles,
+            obstacle_pos,
+            robot.position,
+            self.last_move,
+        )
+        await self.send({"t": "hints", "o": obstacle_pos, "moves": moves})
+
+        if moves:
+            self.speculation = _Speculation(obstacle_pos, moves)
+            self.speculation.start(robot, robot.grid_map)
+
+    async def on_move(self, from_pos: Position, to_pos: Position) -> bool:
+        """
+        Apply a user move and the robot's reply; returns True if the game is over.
+        """
+        robot = self.robot
+        move = (from_pos, to_pos)
+        # Use the reply only if it was already planned: waiting for the
+        # worker to reach this move can take longer than planning it here.
+        speculation = await self.end_speculation()
+        reply = speculation.reply(move) if speculation is not None else None
+
+        if speculation is not None and move in speculation.replies:
+            legal = True
+        else:
+            legal_moves = await run_in_threadpool(
+                _legal_moves_on_grid,
+                robot.grid_map,
+                self.obstacles,
+                from_pos,
+                robot.position,
+                self.last_move,
+            )
+            legal = [to_pos[0], to_pos[1]] in legal_moves
+
+        if not legal:
+            await self.send({"t": "err", "detail": "Illegal obstacle move"})
+            return False
+
+        robot.grid_map.set_cell(from_pos, CellType.EMPTY)
+        robot.grid_map.set_cell(to_pos, CellType.OBSTACLE)
+        self.obstacles.discard(from_pos)
+        self.obstacles.add(to_pos)
+        self.last_move = move
+        if session_store is not None:
+            session_store.record_move(self.session_id, from_pos, to_pos)
+
+        moved = False
+        if robot.battery > 0:
+            step = reply.result() if reply is not None else await run_in_threadpool(robot.next_step)
+            if step is not None:
+                moved = robot.apply_step(step)
+
+        game_over = await self.push_state(moved)
+        _persist_turn(self.session_id, robot, game_over)
+        return game_over
+
+    async def run(self) -> None:
+        if await self.push_state(moved=True):
+            return
+
+        while True:
+            message = await self.receive()
+            if message is None:
+                return
+
+            kind = message.get("t") if isinstance(message, dict) else None
+            try:
+                if kind == "sel":
+                    await self.on_select(_to_pos(message["o"], "o"))
+                elif kind == "mv":
+                    over = await self.on_move(
+                        _to_pos(message["f"], "f"),
+                        _to_pos(message["to"], "to"),
+                    )
+                    if over:
+                        return
+                else:
+                    await self.send({"t": "err", "detail": f"Unknown message type: {kind}"})
+            except (KeyError, TypeError):
+                await self.send({"t": "err", "detail": "Malformed message"})
+            except HTTPException as exc:
+                await self.send({"t": "err", "detail": exc.detail})
+
+
+@app.websocket("/ws/game/{session_id}")
+async def game_socket(websocket: WebSocket, session_id: str):
+    session = await run_in_threadpool(_get_session, session_id)
+    if session is None:
+        await websocket.close(code=4404, reason="Session not found")
+        return
+
+    await websocket.accept()
+    channel = _GameChannel(websocket, session_id, session)
+    try:
+        await channel.run()
+    finally:
+        channel.cancel_speculation()
+    await websocket.close()
+
+
+startup["import_ms"] = (time.perf_counter() - _IMPORT_STARTED) * 1000
@@ -0,0 +1,65 @@
+import os
+import random
+from typing import Iterable, Iterator, List, Tuple
+
+import pytest
+
+from engine.Map_gen import CellType, GridMap, generate_map
+
+# Read by server.server at import time: keep sessions in memory and report
+# ready immediately instead of warming up in the background.
+os.environ.setdefault("PATHWATCH_SESSION_DB", "")
+os.environ.setdefault("PATHWATCH_WARMUP", "0")
+
+Position = Tuple[int, int]
+
+# Seeds for every randomised test.
+SEEDS = range(6)
+
+
+@pytest.fixture(params=SEEDS, ids=lambda seed: f"seed{seed}")
+def rng(request) -> random.Random:
+    return random.Random(request.param)
+
+
+def editable_cells(grid_map: GridMap) -> List[Position]:
+    """
+    Every cell except start and end.
+    """
+    return [pos for pos in grid_map.cells if pos not in (grid_map.start, grid_map.end)]
+
+
+def random_map(rng: random.Random, width: int, height: int, density: float) -> GridMap:
+    """
+    Map with roughly `density` of its cells (start and end excepted) blocked.
+    """
+    grid_map = generate_map(width, height)
+    for pos in editable_cells(grid_map):
+        if rng.random() < density:
+            grid_map.cells[pos] = CellType.OBSTACLE
+    return grid_map
+
+
+def flip(grid_map: GridMap, pos: Position) -> None:
+    """
+    Toggle pos between EMPTY and OBSTACLE through set_cell.
+    """
+    cell = grid_map.cells[pos]
+    grid_map.set_cell(pos, CellType.EMPTY if cell == CellType.OBSTACLE else CellType.OBSTACLE)
+
+
+def random_edits(
+    rng: random.Random,
+    grid_map: GridMap,
+    steps: int,
+    keep: Iterable[Position] = (),
+) -> Iterator[Position]:
+    """
+    Flip `steps` random cells (never start, end or `keep`), yielding each
+    one after it changed so the caller can compare against a rebuild.
+    """
+    cells = [pos for pos in editable_cells(grid_map) if pos not in set(keep)]
+    for _ in range(steps):
+        pos = rng.choice(cells)
+        flip(grid_map, pos)
+        yield pos
@@ -0,0 +1,71 @@
+import heapq
+
+from engine.Map_gen import CellType, generate_map
+from engine.clearance import (
+    CHAMFER_DIAGONAL,
+    CHAMFER_STRAIGHT,
+    FAR,
+    ClearanceMap,
+    clearance_map,
+    safety_profile,
+)
+from tests.conftest import random_edits, random_map
+
+
+def _chamfer_by_dijkstra(grid_map):
+    """
+    Reference 3-4 chamfer distances: multi-source Dijkstra from every obstacle.
+    """
+    width = grid_map.width
+    height = grid_map.height
+    dist = [FAR] * (width * height)
+    heap = []
+    for (x, y), cell in grid_map.cells.items():
+        if cell == CellType.OBSTACLE:
+            dist[y * width + x] = 0
+            heap.append((0, x, y))
+    heapq.heapify(heap)
+    while heap:
+        d, x, y = heapq.heappop(heap)
+        if d != dist[y * width + x]:
+            continue
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                if (dx or dy) and 0 <= nx < width and 0 <= ny < height:
+                    nd = d + (CHAMFER_DIAGONAL if dx and dy else CHAMFER_STRAIGHT)
+                    if nd < dist[ny * width + nx]:
+                        dist[ny * width + nx] = nd
+                        heapq.heappush(heap, (nd, nx, ny))
+    return dist
+
+
+def test_two_pass_transform_matches_dijkstra(rng):
+    grid_map = random_map(rng, 17, 12, 0.08)
+    assert list(ClearanceMap(grid_map).dist) == _chamfer_by_dijkstra(grid_map)
+
+
+def test_incremental_updates_match_rebuild_under_random_edits(rng):
+    grid_map = random_map(rng, 15, 13, 0.1)
+    clearance = clearance_map(grid_map)
+
+    for _ in random_edits(rng, grid_map, 150):
+        assert clearance.dist == ClearanceMap(grid_map).dist
+
+
+def test_removing_the_last_obstacle_restores_far():
+    grid_map = generate_map(6, 6)
+    clearance = clearance_map(grid_map)
+    grid_map.set_cell((3, 3), CellType.OBSTACLE)
+    assert clearance.clearance((0, 3)) == 3
+    grid_map.set_cell((3, 3), CellType.EMPTY)
+    assert set(clearance.dist) == {FAR}
+
+
+def test_safety_profile_rounds_min_clearance_up():
+    grid_map = generate_map(5, 5)
+    profile = safety_profile(grid_map, min_clearance=1.5, weight=2.0, radius=2.0)
+    # 1.5 cells = 4.5 chamfer units; only whole units exist, so 5 is needed.
+    assert profile.min_dist == 5
+    assert profile.penalty == [4, 3, 3, 2, 1, 1]
+    assert profile.max_penalty == 4
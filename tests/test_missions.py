@@ -0,0 +1,64 @@
+import itertools
+
+from engine.Map_gen import CellType, generate_map
+from engine.missions import INF, DistanceField, distance_matrix, held_karp_order
+from tests.conftest import random_edits, random_map
+
+
+def test_distance_fields_match_rebuild_under_random_edits(rng):
+    grid_map = random_map(rng, 14, 11, 0.25)
+    free = [pos for pos, cell in grid_map.cells.items() if cell == CellType.EMPTY]
+    points = rng.sample(free, 3) + [grid_map.end]
+    matrix = distance_matrix(grid_map, points)
+
+    for _ in random_edits(rng, grid_map, 120, keep=points):
+        for point, field in zip(points, matrix.fields):
+            assert field.dist == DistanceField(grid_map, point).dist
+
+
+def test_matrix_version_bumps_only_when_point_distances_change():
+    grid_map = generate_map(7, 5)
+    points = [(3, 2), grid_map.end]
+    matrix = distance_matrix(grid_map, points)
+    assert matrix.distance(0, 1) == 3 + 2
+
+    # Off every shortest route between the points: no version bump.
+    grid_map.set_cell((0, 4), CellType.OBSTACLE)
+    assert matrix.version == 0
+
+    # A wall whose only gap is at y = 0 forces a detour.
+    for y in range(1, 5):
+        grid_map.set_cell((5, y), CellType.OBSTACLE)
+    assert matrix.version > 0
+    assert matrix.distance(0, 1) == 2 + 3 + 4
+
+
+def test_distance_matrix_is_cached_per_point_set():
+    grid_map = generate_map(6, 6)
+    points = [(2, 2), grid_map.end]
+    assert distance_matrix(grid_map, points) is distance_matrix(grid_map, points)
+    assert distance_matrix(grid_map, points[::-1]) is not distance_matrix(grid_map, points)
+
+
+def test_held_karp_orders_unreachable_waypoints_without_failing():
+    # Every leg unreachable: sums of INF exceed any fixed sentinel.
+    k = 5
+    order = held_karp_order([INF] * k, [[INF] * k for _ in range(k)], [INF] * k)
+    assert sorted(order) == list(range(k))
+
+
+def test_held_karp_matches_brute_force(rng):
+    k = 5
+    cost = [[0 if a == b else rng.randint(1, 20) for b in range(k)] for a in range(k)]
+    start_cost = [rng.randint(1, 20) for _ in range(k)]
+    end_cost = [rng.randint(1, 20) for _ in range(k)]
+
+    def tour(order):
+        return (
+            start_cost[order[0]]
+            + sum(cost[a][b] for a, b in zip(order, order[1:]))
+            + end_cost[order[-1]]
+        )
+
+    best = min(tour(order) for order in itertools.permutations(range(k)))
+    assert tour(held_karp_order(start_cost, cost, end_cost)) == best
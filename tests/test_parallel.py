@@ -0,0 +1,62 @@
+import pytest
+
+from engine.Map_gen import CellType
+from engine.parallel import ParallelBFS, get_search
+from engine.pathfinding import bfs_shortest_path
+from tests.conftest import random_edits, random_map
+
+WIDTH, HEIGHT = 15, 12
+
+
+@pytest.fixture(scope="module")
+def search():
+    with ParallelBFS(WIDTH, HEIGHT, workers=3) as search:
+        yield search
+
+
+def _bfs_distance(grid_map, start, goal):
+    path = bfs_shortest_path(grid_map, start, goal)
+    return -1 if path is None else len(path) - 1
+
+
+def _check_path(grid_map, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        assert abs(ax - bx) + abs(ay - by) == 1
+        assert grid_map.cells[(bx, by)] != CellType.OBSTACLE
+
+
+def test_distances_match_bfs(search, rng):
+    grid_map = random_map(rng, WIDTH, HEIGHT, 0.25)
+    field = search.distances(grid_map, grid_map.start)
+    for (x, y), cell in grid_map.cells.items():
+        expected = -1 if cell == CellType.OBSTACLE else _bfs_distance(grid_map, grid_map.start, (x, y))
+        assert field[y * WIDTH + x] == expected
+
+
+def test_paths_match_bfs_under_random_edits(search, rng):
+    grid_map = random_map(rng, WIDTH, HEIGHT, 0.2)
+    start, end = grid_map.start, grid_map.end
+    for _ in random_edits(rng, grid_map, 40):
+        path = search.shortest_path(grid_map, start, end)
+        expected = bfs_shortest_path(grid_map, start, end)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            _check_path(grid_map, path, start, end)
+
+
+def test_mask_follows_the_map_it_was_loaded_from(search, rng):
+    first = random_map(rng, WIDTH, HEIGHT, 0.2)
+    second = random_map(rng, WIDTH, HEIGHT, 0.2)
+    search.load_mask(first)
+    search.load_mask(second)
+    assert search._mask_key not in first.derived
+    for pos in random_edits(rng, second, 20):
+        x, y = pos
+        assert search._mask_shm.buf[y * WIDTH + x] == (second.cells[pos] == CellType.OBSTACLE)
+
+
+def test_pools_are_reused_per_size():
+    assert get_search(WIDTH, HEIGHT, 2) is get_search(WIDTH, HEIGHT, 2)
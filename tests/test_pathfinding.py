@@ -0,0 +1,179 @@
+import heapq
+import math
+
+import pytest
+
+from engine import pathfinding
+from engine.Map_gen import CellType, generate_map, make_costs
+from engine.pathfinding import (
+    ObstacleRows,
+    ara_star_path,
+    ara_star_search,
+    astar_shortest_path,
+    bfs_shortest_path,
+    dijkstra_shortest_path,
+    obstacle_rows,
+    prm_path,
+    prm_roadmap,
+    rrt_path,
+    rrt_star_path,
+)
+from tests.conftest import random_edits, random_map
+
+
+def _heap_dijkstra_cost(grid_map, start, goal):
+    """
+    Reference cheapest cost with a binary heap (None if unreachable).
+    """
+    best = {start: 0}
+    heap = [(0, start)]
+    while heap:
+        g, (x, y) = heapq.heappop(heap)
+        if (x, y) == goal:
+            return g
+        if g != best[(x, y)]:
+            continue
+        for nxt in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if not grid_map.in_bounds(*nxt) or grid_map.cells[nxt] == CellType.OBSTACLE:
+                continue
+            g_next = g + grid_map.cost(nxt)
+            if g_next < best.get(nxt, g_next + 1):
+                best[nxt] = g_next
+                heapq.heappush(heap, (g_next, nxt))
+    return None
+
+
+def _path_cost(grid_map, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        assert abs(ax - bx) + abs(ay - by) == 1
+        assert grid_map.cells[(bx, by)] != CellType.OBSTACLE
+    return sum(grid_map.cost(pos) for pos in path[1:])
+
+
+def _terrain_map(rng, low, high):
+    grid_map = random_map(rng, 16, 12, 0.2)
+    terrain = {pos: rng.randint(low, high) for pos in grid_map.cells}
+    grid_map.costs = make_costs(grid_map.width, grid_map.height, terrain)
+    return grid_map
+
+
+# (low, high) entry costs; a floor above 1 exercises the heuristic scaling.
+@pytest.mark.parametrize("low, high", [(1, 1), (1, 9), (3, 7)])
+@pytest.mark.parametrize("planner", [dijkstra_shortest_path, astar_shortest_path])
+def test_bucket_search_matches_heap_dijkstra(rng, planner, low, high):
+    grid_map = _terrain_map(rng, low, high)
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    for _ in range(15):
+        start, goal = rng.choice(free), rng.choice(free)
+        expected = _heap_dijkstra_cost(grid_map, start, goal)
+        path = planner(grid_map, start, goal)
+        if expected is None:
+            assert path is None
+        else:
+            assert _path_cost(grid_map, path, start, goal) == expected
+
+
+# -----------------------------
+# Anytime ARA*
+# -----------------------------
+def test_ara_star_without_budget_is_optimal(rng):
+    grid_map = _terrain_map(rng, 1, 9)
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    for _ in range(10):
+        start, goal = rng.choice(free), rng.choice(free)
+        expected = _heap_dijkstra_cost(grid_map, start, goal)
+        result = ara_star_search(grid_map, start, goal)
+        if expected is None:
+            assert result.path is None and result.bound == math.inf
+        else:
+            assert result.bound == 1.0
+            assert _path_cost(grid_map, result.path, start, goal) == expected
+
+
+def test_ara_star_bound_holds_after_each_round_count(rng):
+    grid_map = _terrain_map(rng, 1, 9)
+    start, goal = grid_map.start, grid_map.end
+    expected = _heap_dijkstra_cost(grid_map, start, goal)
+    if expected is None:
+        pytest.skip("end walled off on this seed")
+    for step in (0.5, 1.0, 2.0):
+        result = ara_star_search(grid_map, start, goal, weight_step=step)
+        assert _path_cost(grid_map, result.path, start, goal) <= result.bound * expected
+
+
+def _serpentine_map(size=60):
+    # Walls every other row with the gap at alternating ends, so even the
+    # greediest round expands thousands of cells.
+    grid_map = generate_map(size, size)
+    for y in range(1, size - 1, 2):
+        gap = size - 1 if y % 4 == 1 else 0
+        for x in range(size):
+            if x != gap:
+                grid_map.cells[(x, y)] = CellType.OBSTACLE
+    return grid_map
+
+
+def test_ara_star_stops_at_the_deadline_in_the_first_round():
+    grid_map = _serpentine_map()
+    result = ara_star_search(grid_map, grid_map.start, grid_map.end, time_budget=0.0)
+
+    assert result.rounds == 0 and result.bound == math.inf
+    assert result.path[-1] != grid_map.end
+    _path_cost(grid_map, result.path, grid_map.start, result.path[-1])
+    # The clock is read every _ARA_CLOCK_EVERY expansions; a spent budget
+    # stops the first check, so the partial path cannot be longer.
+    assert len(result.path) <= pathfinding._ARA_CLOCK_EVERY + 1
+
+
+def test_ara_star_path_falls_back_to_astar_on_a_partial_path(monkeypatch):
+    monkeypatch.setattr(pathfinding, "ARA_DEFAULT_BUDGET", 0.0)
+    grid_map = _serpentine_map()
+    path = ara_star_path(grid_map, grid_map.start, grid_map.end)
+    expected = astar_shortest_path(grid_map, grid_map.start, grid_map.end)
+    assert _path_cost(grid_map, path, grid_map.start, grid_map.end) == len(expected) - 1
+
+
+# -----------------------------
+# Sampling planners
+# -----------------------------
+@pytest.mark.parametrize("planner", [rrt_path, rrt_star_path, prm_path])
+def test_sampling_planners_return_valid_paths(rng, planner):
+    grid_map = random_map(rng, 20, 15, 0.2)
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    found = 0
+    for _ in range(6):
+        start, goal = rng.choice(free), rng.choice(free)
+        path = planner(grid_map, start, goal)
+        if bfs_shortest_path(grid_map, start, goal) is None:
+            assert path is None
+        elif path is not None:
+            _path_cost(grid_map, path, start, goal)
+            found += 1
+    assert found
+
+
+def test_obstacle_rows_and_prm_follow_random_edits(rng):
+    grid_map = random_map(rng, 18, 14, 0.15)
+    rows = obstacle_rows(grid_map)
+    roadmap = prm_roadmap(grid_map)
+    for _ in random_edits(rng, grid_map, 60):
+        assert rows.rows == ObstacleRows(grid_map).rows
+        for ident, pos in roadmap.nodes.items():
+            assert grid_map.cells[pos] != CellType.OBSTACLE
+            for other in roadmap.edges[ident]:
+                assert rows.line_of_sight(pos, roadmap.nodes[other])
+    start, goal = grid_map.start, grid_map.end
+    path = prm_path(grid_map, start, goal)
+    if path is not None:
+        _path_cost(grid_map, path, start, goal)
+
+
+def test_rasterized_segments_stay_clear_when_line_of_sight_holds(rng):
+    grid_map = random_map(rng, 16, 16, 0.2)
+    rows = obstacle_rows(grid_map)
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    for _ in range(100):
+        a, b = rng.choice(free), rng.choice(free)
+        if rows.line_of_sight(a, b):
+            _path_cost(grid_map, rows.rasterize(a, b), a, b)
@@ -0,0 +1,140 @@
+import random
+
+import pytest
+
+from engine.Map_gen import make_costs
+from server import persistence
+from server.persistence import (
+    COMPACT_EVERY,
+    SessionStore,
+    decode_bitmap,
+    encode_bitmap,
+)
+
+WIDTH, HEIGHT = 12, 9
+START, END = (0, 0), (WIDTH - 1, HEIGHT - 1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def _random_obstacles(rng, count):
+    cells = [(x, y) for x in range(WIDTH) for y in range(HEIGHT) if (x, y) not in (START, END)]
+    return set(rng.sample(cells, count))
+
+
+def _random_move(rng, obstacles):
+    while True:
+        x, y = rng.choice(sorted(obstacles))
+        to = rng.choice([(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)])
+        if 0 <= to[0] < WIDTH and 0 <= to[1] < HEIGHT and to not in obstacles and to not in (START, END):
+            return (x, y), to
+
+
+def _start(store, session_id, obstacles, costs=None):
+    store.record_start(
+        session_id, WIDTH, HEIGHT, START, END, sorted(obstacles),
+        [(3, 3)], [(3, 3)], costs, START, 21, 21,
+    )
+
+
+def test_bitmap_round_trip(rng):
+    obstacles = _random_obstacles(rng, rng.randrange(0, 40))
+    bitmap = encode_bitmap(WIDTH, HEIGHT, obstacles)
+    assert len(bitmap) == (WIDTH * HEIGHT + 7) // 8
+    assert set(decode_bitmap(WIDTH, bytes(bitmap))) == obstacles
+
+
+def test_moves_replay_across_compaction(store):
+    rng = random.Random(7)
+    obstacles = _random_obstacles(rng, 25)
+    _start(store, "s", obstacles)
+
+    for turn in range(COMPACT_EVERY * 2 + 5):
+        from_pos, to_pos = _random_move(rng, obstacles)
+        obstacles.discard(from_pos)
+        obstacles.add(to_pos)
+        store.record_move("s", from_pos, to_pos)
+        if turn % 9 == 0:
+            store.flush()
+            assert set(store.load("s").obstacles) == obstacles
+
+    store.flush()
+    assert set(store.load("s").obstacles) == obstacles
+    pending = store._conn.execute("SELECT COUNT(*) FROM deltas WHERE session_id = 's'").fetchone()[0]
+    assert pending < COMPACT_EVERY
+
+
+def test_turn_obstacles_are_stored_as_delta_or_snapshot(store):
+    rng = random.Random(3)
+    obstacles = _random_obstacles(rng, 20)
+    _start(store, "s", obstacles)
+
+    # One move: a single delta row.
+    from_pos, to_pos = _random_move(rng, obstacles)
+    obstacles.discard(from_pos)
+    obstacles.add(to_pos)
+    store.record_turn("s", (1, 0), 20, [(3, 3)], sorted(obstacles))
+    store.flush()
+    assert store._conn.execute("SELECT COUNT(*) FROM deltas").fetchone()[0] == 1
+
+    # Several changes at once: a new snapshot, deltas cleared.
+    obstacles = _random_obstacles(rng, 12)
+    store.record_turn("s", (2, 0), 19, [], sorted(obstacles))
+    store.flush()
+    assert store._conn.execute("SELECT COUNT(*) FROM deltas").fetchone()[0] == 0
+
+    record = store.load("s")
+    assert set(record.obstacles) == obstacles
+    assert record.robot_position == (2, 0)
+    assert record.battery == 19
+    assert record.remaining_waypoints == []
+
+
+def test_restore_after_reopen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    costs = make_costs(WIDTH, HEIGHT, {(4, 4): 7})
+    obstacles = {(5, 5), (6, 2)}
+
+    store = SessionStore(path)
+    _start(store, "s", obstacles, costs)
+    store.record_move("s", (5, 5), (5, 6))
+    store.close()
+
+    store = SessionStore(path)
+    try:
+        record = store.load("s")
+        assert set(record.obstacles) == {(5, 6), (6, 2)}
+        assert record.waypoints == [(3, 3)]
+        assert record.costs == costs
+        store.record_end("s")
+        store.flush()
+        assert store.load("s") is None
+    finally:
+        store.close()
+
+
+def test_writer_cache_is_bounded(store, monkeypatch):
+    monkeypatch.setattr(persistence, "CACHED_SESSIONS", 3)
+    rng = random.Random(5)
+    expected = {}
+    for i in range(8):
+        expected[i] = _random_obstacles(rng, 15)
+        _start(store, f"s{i}", expected[i])
+    store.flush()
+    assert len(store._cache) == 3
+
+    # Evicted sessions are reloaded from the database on their next move.
+    for i in range(8):
+        from_pos, to_pos = _random_move(rng, expected[i])
+        expected[i].discard(from_pos)
+        expected[i].add(to_pos)
+        store.record_move(f"s{i}", from_pos, to_pos)
+    store.flush()
+    assert len(store._cache) == 3
+    for i in range(8):
+        assert set(store.load(f"s{i}").obstacles) == expected[i]
@@ -0,0 +1,35 @@
+from engine import reachability
+from engine.Map_gen import CellType
+from engine.pathfinding import bfs_shortest_path
+from engine.reachability import get_engine, is_reachable, route_exists
+from tests.conftest import editable_cells, random_edits, random_map
+
+
+def _bfs_route_exists(grid_map):
+    goals = [grid_map.end] + grid_map.waypoints
+    return all(bfs_shortest_path(grid_map, grid_map.start, goal) is not None for goal in goals)
+
+
+def test_route_exists_matches_bfs_under_random_edits(rng):
+    grid_map = random_map(rng, 14, 11, 0.3)
+    free = [pos for pos in editable_cells(grid_map) if grid_map.cells[pos] != CellType.OBSTACLE]
+    grid_map.waypoints = rng.sample(free, 3)
+
+    for _ in random_edits(rng, grid_map, 60, keep=grid_map.waypoints):
+        assert route_exists(grid_map) == _bfs_route_exists(grid_map)
+
+
+def test_is_reachable_matches_bfs_between_random_cells(rng):
+    grid_map = random_map(rng, 13, 9, 0.35)
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    for _ in range(80):
+        a, b = rng.choice(free), rng.choice(free)
+        assert is_reachable(grid_map, a, b) == (bfs_shortest_path(grid_map, a, b) is not None)
+
+
+def test_engines_are_kept_per_size_up_to_the_limit():
+    first = get_engine(7, 3)
+    assert get_engine(7, 3) is first
+    for width in range(reachability.ENGINES_PER_THREAD):
+        get_engine(20 + width, 3)
+    assert get_engine(7, 3) is not first
@@ -0,0 +1,32 @@
+import pytest
+from pydantic import BaseModel
+
+from server.responses import decode_json, decode_msgpack, encode_json, encode_msgpack, wants_msgpack
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", False),
+    ("application/json", False),
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("application/json, application/msgpack", True),
+    ("application/json, application/msgpack;q=0.5", False),
+    ("application/msgpack;q=0.9, */*;q=0.8", True),
+    ("*/*, application/msgpack;q=0.9", False),
+    ("application/msgpack;q=0", False),
+    ("application/msgpack;q=bogus", False),
+])
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) == expected
+
+
+class _Model(BaseModel):
+    moves: list
+    seen: set
+
+
+def test_constructed_models_round_trip_in_both_encodings():
+    model = _Model.model_construct(moves=[[1, 2]], seen={3})
+    expected = {"moves": [[1, 2]], "seen": [3]}
+    assert decode_json(encode_json(model)) == expected
+    assert decode_msgpack(encode_msgpack(model)) == expected
@@ -0,0 +1,167 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from engine.robot import Robot
+from server.responses import decode_json, decode_msgpack
+from server.server import (
+    GameStateResponse,
+    LegalMovesResponse,
+    MoveObstacleResponse,
+    app,
+    debug_router,
+)
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def _map(width=20, height=5, obstacles=(), waypoints=(), terrain=()):
+    return {
+        "width": width,
+        "height": height,
+        "start": [0, 0],
+        "end": [width - 1, height - 1],
+        "obstacles": [list(pos) for pos in obstacles],
+        "waypoints": [list(pos) for pos in waypoints],
+        "terrain": [list(entry) for entry in terrain],
+    }
+
+
+def _walled_in(points):
+    walls = set()
+    for x, y in points:
+        walls |= {(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)}
+    return sorted(walls)
+
+
+@pytest.mark.parametrize("count", [2, 5])
+def test_start_game_rejects_unreachable_waypoints(client, count):
+    waypoints = [(2 + 3 * i, 2) for i in range(count)]
+    response = client.post("/start-game", json=_map(obstacles=_walled_in(waypoints), waypoints=waypoints))
+    assert response.status_code == 400
+    assert "unreachable" in response.json()["detail"]
+
+
+def test_next_move_rebuilds_mission_when_waypoints_change(client):
+    state = client.post("/start-game", json=_map(waypoints=[(10, 0)])).json()
+    assert state["robot_position"] == [1, 0]
+    assert state["remaining_waypoints"] == [[10, 0]]
+
+    # The waypoint moves behind the robot: the next step must head back.
+    updated = _map(waypoints=[(0, 4)])
+    state = client.post("/next-move", json={"session_id": state["session_id"], "updated_map": updated}).json()
+    assert state["remaining_waypoints"] == [[0, 4]]
+    assert state["robot_position"] in ([0, 0], [1, 1])
+
+    state = client.post("/next-move", json={"session_id": state["session_id"], "updated_map": _map()}).json()
+    assert state["remaining_waypoints"] == []
+
+
+def _play_one_move(client, wait=0.0):
+    state = client.post("/start-game", json=_map(obstacles=[(5, 2)])).json()
+    with client.websocket_connect(f"/ws/game/{state['session_id']}") as ws:
+        assert ws.receive_json()["t"] == "state"
+        ws.send_json({"t": "sel", "o": [5, 2]})
+        hints = ws.receive_json()
+        assert hints["t"] == "hints" and hints["moves"]
+        time.sleep(wait)
+        ws.send_json({"t": "mv", "f": [5, 2], "to": hints["moves"][0]})
+        return ws.receive_json()
+
+
+@pytest.mark.parametrize("wait", [0.0, 0.2])
+def test_socket_move_gets_robot_reply(client, wait):
+    state = _play_one_move(client, wait)
+    assert state["t"] == "state"
+    assert state["moved"] and state["pos"] in ([2, 0], [1, 1])
+
+
+def test_socket_move_survives_failed_speculation(client, monkeypatch):
+    def broken(self, grid_map=None):
+        raise RuntimeError("planner bug")
+
+    monkeypatch.setattr(Robot, "plan_step", broken)
+    state = _play_one_move(client, wait=0.2)
+    assert state["t"] == "state" and state["moved"]
+
+
+def test_debug_endpoints_are_not_mounted_by_default(client):
+    assert client.get("/debug/memory").status_code == 404
+    assert not any(path.startswith("/debug") for path in client.get("/openapi.json").json()["paths"])
+
+
+def test_debug_router_stays_out_of_the_schema():
+    debug_app = FastAPI()
+    debug_app.include_router(debug_router)
+    with TestClient(debug_app) as debug_client:
+        assert debug_client.get("/debug/memory").status_code == 200
+        assert not debug_client.get("/openapi.json").json()["paths"]
+
+
+def _start_payload():
+    return _map(obstacles=[(5, 2)], waypoints=[(10, 0)], terrain=[(3, 3, 4)])
+
+
+def _session_payload(client, **extra):
+    session_id = client.post("/start-game", json=_start_payload()).json()["session_id"]
+    return {"session_id": session_id, "updated_map": _start_payload(), **extra}
+
+
+# endpoint -> (request body factory, response model)
+_ENDPOINTS = {
+    "/start-game": (lambda client: _start_payload(), GameStateResponse),
+    "/next-move": (lambda client: _session_payload(client), GameStateResponse),
+    "/legal-obstacle-moves": (lambda client: _session_payload(client, obstacle=[5, 2]), LegalMovesResponse),
+    "/move-obstacle": (
+        lambda client: _session_payload(client, from_pos=[5, 2], to_pos=[6, 2]),
+        MoveObstacleResponse,
+    ),
+}
+
+
+def _without_session(content):
+    return {key: value for key, value in content.items() if key != "session_id"}
+
+
+@pytest.mark.parametrize("path", list(_ENDPOINTS))
+def test_endpoints_negotiate_json_and_msgpack(client, path):
+    body, model = _ENDPOINTS[path]
+    as_json = client.post(path, json=body(client), headers={"Accept": "application/json"})
+    as_msgpack = client.post(path, json=body(client), headers={"Accept": "application/msgpack"})
+
+    assert as_json.status_code == as_msgpack.status_code == 200
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    for response in (as_json, as_msgpack):
+        assert "Accept" in response.headers["vary"]
+
+    json_content = decode_json(as_json.content)
+    msgpack_content = decode_msgpack(as_msgpack.content)
+    assert _without_session(json_content) == _without_session(msgpack_content)
+    model.model_validate(json_content)
+
+
+@pytest.mark.parametrize("accept, decode", [
+    ("application/json", decode_json),
+    ("application/msgpack", decode_msgpack),
+])
+def test_ping_negotiates(client, accept, decode):
+    response = client.get("/ping", headers={"Accept": accept})
+    assert response.headers["content-type"] == accept
+    assert decode(response.content)["status"] == "alive"
+
+
+@pytest.mark.parametrize("budget, status", [(50, 200), (0, 400), (10 ** 9, 400)])
+def test_next_move_time_budget(client, budget, status):
+    payload = _session_payload(client, time_budget_ms=budget)
+    response = client.post("/next-move", json=payload)
+    assert response.status_code == status
+    if status == 200:
+        # A small map is solved optimally well within the budget.
+        assert response.json()["suboptimality_bound"] == 1.0
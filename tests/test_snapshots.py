@@ -0,0 +1,119 @@
+import gc
+
+import pytest
+
+from engine.Map_gen import CellType, generate_map
+from engine.Obstacles import ObstacleManager
+from tests.conftest import editable_cells, flip, random_map
+
+
+def test_snapshot_isolation_under_random_edits(rng):
+    base = random_map(rng, 9, 7, 0.25)
+    cells = editable_cells(base)
+
+    snap = base.snapshot()
+    expected_base = dict(base.cells)
+    expected_snap = dict(base.cells)
+    for _ in range(200):
+        pos = rng.choice(cells)
+        if rng.random() < 0.5:
+            flip(base, pos)
+            expected_base[pos] = base.cells[pos]
+        else:
+            flip(snap, pos)
+            expected_snap[pos] = snap.cells[pos]
+
+        assert dict(base.cells) == expected_base
+        assert dict(snap.cells.items()) == expected_snap
+        assert snap.cells.get(pos) == expected_snap[pos]
+        assert len(snap.cells) == len(expected_snap)
+
+
+def test_snapshot_link_is_dropped_on_release_and_gc():
+    base = generate_map(5, 5)
+    snap = base.snapshot()
+    assert len(base.derived) == 1
+
+    base.set_cell((2, 2), CellType.OBSTACLE)
+    assert snap.cells[(2, 2)] == CellType.EMPTY
+    snap.release()
+    assert not base.derived
+
+    base.snapshot()
+    gc.collect()
+    assert not base.derived
+
+
+def test_derived_structures_are_not_shared_with_snapshots():
+    base = generate_map(5, 5)
+    base.derived["marker"] = object()
+    assert "marker" not in base.snapshot().derived
+
+
+# -----------------------------
+# Transactions
+# -----------------------------
+def _walled_manager():
+    # Wall at x = 2 with its only gap at (2, 4).
+    grid_map = generate_map(5, 5)
+    wall = [(2, y) for y in range(4)]
+    for pos in wall:
+        grid_map.cells[pos] = CellType.OBSTACLE
+    return ObstacleManager(grid_map, wall)
+
+
+def _obstacle_cells(grid_map):
+    return {pos for pos, cell in grid_map.cells.items() if cell == CellType.OBSTACLE}
+
+
+def test_transaction_is_invisible_until_commit():
+    manager = _walled_manager()
+    before = _obstacle_cells(manager.grid_map)
+    with manager.begin() as tx:
+        assert tx.move((2, 0), (1, 0))
+        assert tx.has_obstacle((1, 0)) and not tx.has_obstacle((2, 0))
+        assert _obstacle_cells(manager.grid_map) == before
+        assert _obstacle_cells(tx.grid_map) == before - {(2, 0)} | {(1, 0)}
+        assert tx.commit()
+
+    assert manager.obstacles == before - {(2, 0)} | {(1, 0)}
+    assert _obstacle_cells(manager.grid_map) == manager.obstacles
+    assert not manager.grid_map.derived
+
+
+def test_rejected_and_aborted_transactions_leave_no_trace():
+    manager = _walled_manager()
+    manager.place_initial_obstacles([(1, 3)])
+    before = set(manager.obstacles)
+    version = manager.version
+    for _ in range(50):
+        # (1, 4) is the only way to the gap from the start's side.
+        assert not manager.move_obstacle((1, 3), (1, 4))
+        with manager.begin() as tx:
+            tx.place((0, 4))
+
+    assert manager.obstacles == before
+    assert _obstacle_cells(manager.grid_map) == before
+    assert manager.version == version
+    assert not manager.grid_map.derived
+
+
+def test_net_edits_cancel_out():
+    manager = _walled_manager()
+    with manager.begin() as tx:
+        tx.remove((2, 0))
+        tx.place((2, 0))
+        tx.place((4, 0))
+        tx.remove((4, 0))
+        assert not tx.added and not tx.removed
+
+
+def test_commit_fails_when_live_obstacles_changed():
+    manager = _walled_manager()
+    tx = manager.begin()
+    assert tx.move((2, 0), (1, 0))
+    assert manager.move_obstacle((2, 1), (3, 1))
+    assert not tx.commit()
+    assert (1, 0) not in manager.obstacles
+    with pytest.raises(RuntimeError):
+        tx.place((0, 4))
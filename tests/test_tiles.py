@@ -0,0 +1,79 @@
+import pytest
+
+from engine.Map_gen import CellType
+from engine.pathfinding import astar_shortest_path, bfs_shortest_path, dijkstra_shortest_path
+from engine.tiles import TiledMap
+from tests.conftest import flip, random_edits, random_map
+
+# Sizes that are not multiples of the tile size, and a cache smaller than
+# the map, so edge tiles and evictions are both exercised.
+WIDTH, HEIGHT = 37, 23
+TILE_SIZE = 8
+CACHE_TILES = 3
+
+
+@pytest.fixture
+def maps(rng, tmp_path):
+    grid_map = random_map(rng, WIDTH, HEIGHT, 0.25)
+    obstacles = [pos for pos, cell in grid_map.cells.items() if cell == CellType.OBSTACLE]
+    tiled = TiledMap.create(
+        str(tmp_path / "map.tiles"), WIDTH, HEIGHT, grid_map.start, grid_map.end,
+        obstacles, tile_size=TILE_SIZE, cache_tiles=CACHE_TILES,
+    )
+    yield grid_map, tiled
+    tiled.close()
+
+
+def _same_cells(grid_map, tiled):
+    assert dict(tiled.cells.items()) == grid_map.cells
+    assert tiled.resident_tiles <= CACHE_TILES
+
+
+def test_tiled_map_matches_grid_map_under_random_edits(rng, maps):
+    grid_map, tiled = maps
+    _same_cells(grid_map, tiled)
+    for pos in random_edits(rng, grid_map, 120):
+        flip(tiled, pos)
+        assert tiled.cells[pos] == grid_map.cells[pos]
+    _same_cells(grid_map, tiled)
+
+
+@pytest.mark.parametrize("planner", [bfs_shortest_path, dijkstra_shortest_path, astar_shortest_path])
+def test_planners_agree_on_tiled_and_in_memory_maps(rng, maps, planner):
+    grid_map, tiled = maps
+    free = [pos for pos, cell in grid_map.cells.items() if cell != CellType.OBSTACLE]
+    for _ in range(10):
+        start, goal = rng.choice(free), rng.choice(free)
+        expected = planner(grid_map, start, goal)
+        path = planner(tiled, start, goal)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            assert all(tiled.cells[pos] != CellType.OBSTACLE for pos in path)
+
+
+def test_reopened_map_keeps_written_cells(rng, maps):
+    grid_map, tiled = maps
+    for pos in random_edits(rng, grid_map, 30):
+        flip(tiled, pos)
+    tiled.flush()
+    tiled.close()
+
+    with TiledMap.open(tiled.path, cache_tiles=CACHE_TILES, writable=False) as reopened:
+        assert (reopened.start, reopened.end) == (grid_map.start, grid_map.end)
+        _same_cells(grid_map, reopened)
+
+
+def test_invalid_files_and_positions(tmp_path):
+    path = tmp_path / "bogus.tiles"
+    path.write_bytes(b"\0" * 4096)
+    with pytest.raises(ValueError):
+        TiledMap.open(str(path))
+    with pytest.raises(ValueError):
+        TiledMap.create(str(tmp_path / "odd.tiles"), 10, 10, (0, 0), (9, 9), tile_size=6)
+
+    with TiledMap.create(str(tmp_path / "small.tiles"), 10, 10, (0, 0), (9, 9), tile_size=4) as tiled:
+        assert (10, 0) not in tiled.cells
+        with pytest.raises(KeyError):
+            tiled.cells[(10, 0)]